@@ -32,6 +32,10 @@ apt-get install -y python3-aiohttp python3-libvirt python3-jwt python3-bcrypt ||
 }
 echo "✓ Python dependencies installed"
 
+# Optional: faster JSON handling (falls back to the json module if missing)
+apt-get install -y python3-orjson || echo "Warning: python3-orjson not available, using json module"
+apt-get install -y python3-msgspec || echo "Warning: python3-msgspec not available, decoding with orjson or json"
+
 # Create starlight-users group
 echo ""
 echo "Creating starlight-users group..."
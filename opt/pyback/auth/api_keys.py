@@ -5,14 +5,24 @@ Handles creation, validation, and management of API keys for
 programmatic access to the Starlight API.
 """
 
+import asyncio
+import functools
+import hashlib
+import hmac
 import logging
+import os
 import secrets
-import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, List, Any
 
 from ..config_loader import get_config_file_path, API_KEYS_PATH as CONFIG_API_KEYS_PATH
+from ..utils.file_operations import write_file_atomic
+from ..utils.json_utils import json_dumps, json_loads
+from .jwt_auth import load_auth_config
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +31,7 @@ try:
     BCRYPT_AVAILABLE = True
 except ImportError:
     BCRYPT_AVAILABLE = False
-    logger.warning("bcrypt not available. API key hashing will be disabled.")
+    logger.warning("bcrypt not available. Legacy bcrypt API keys cannot be verified.")
 
 # Configuration paths - use config_loader paths with fallback
 def _get_api_keys_path():
@@ -42,75 +52,167 @@ API_KEYS_PATH = _get_api_keys_path()
 # API key prefix for identification
 API_KEY_PREFIX = 'stl_'
 
+# Parsed keys file, reused until the file's mtime changes on disk
+_CACHE = {'path': None, 'mtime_ns': 0, 'data': None}
+
+# Digest and mtime of the last keys file we wrote, to skip no-op saves
+_LAST_WRITE = {'digest': None, 'mtime_ns': None}
+
+# Recently verified keys: sha256(api_key) -> (verified_at, lookup, result)
+VERIFY_CACHE_MAX = 1024
+VERIFY_CACHE_TTL = 300  # seconds
+_VERIFY_CACHE: 'OrderedDict[bytes, tuple]' = OrderedDict()
+
+# last_used_at updates waiting to be written: key_id -> ISO timestamp
+LAST_USED_FLUSH_INTERVAL = 10  # seconds
+_pending_last_used: Dict[str, str] = {}
+_pending_lock = threading.Lock()
+
+# Serializes access to the keys data, since verify_api_key runs on worker
+# threads while the management functions run on the event loop. Held only
+# while the data and caches are read or changed, never while hashing.
+_KEYS_LOCK = threading.RLock()
+
+
+def _with_keys_lock(func):
+    """Decorator to hold _KEYS_LOCK for the duration of a call."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _KEYS_LOCK:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _lookup_for_hash(hashed_key: str) -> str:
+    """
+    Get the non-secret index used to locate a stored API key.
+    
+    The index is the key's HMAC-SHA256 hash from hash_api_key(), truncated
+    to 128 bits, so one HMAC both finds and verifies a key.
+    """
+    return hashed_key[:32]
+
+
+def _migrate_keys(data: dict) -> dict:
+    """
+    Convert the legacy list layout to the lookup-indexed dict layout.
+    
+    Keys created before the lookup index existed are stored under their
+    key ID until they are next verified, at which point they are re-indexed.
+    """
+    keys = data.get('keys')
+    if isinstance(keys, list):
+        data['keys'] = {k.get('lookup') or k['id']: k for k in keys}
+    elif keys is None:
+        data['keys'] = {}
+    return data
+
 
 def load_api_keys() -> dict:
     """Load API keys from storage file."""
     keys_path = Path(_get_api_keys_path())
     
-    if not keys_path.exists():
+    try:
+        mtime_ns = os.stat(keys_path).st_mtime_ns
+    except FileNotFoundError:
         keys_path.parent.mkdir(parents=True, exist_ok=True)
-        default_data = {'keys': []}
+        default_data = {'keys': {}}
         save_api_keys(default_data)
         return default_data
     
+    if _CACHE['path'] == keys_path and _CACHE['mtime_ns'] == mtime_ns:
+        return _CACHE['data']
+    
     try:
-        with open(keys_path, 'r') as f:
-            return json.load(f)
+        data = _migrate_keys(json_loads(keys_path.read_bytes()))
     except Exception as e:
         logger.error(f"Error loading API keys: {e}")
-        return {'keys': []}
+        return {'keys': {}}
+    
+    _CACHE.update(path=keys_path, mtime_ns=mtime_ns, data=data)
+    return data
 
 
 def save_api_keys(data: dict):
-    """Save API keys to storage file."""
+    """Save API keys to storage file, skipping the write if nothing changed."""
     try:
+        payload = json_dumps(data)
+        digest = hashlib.sha256(payload).digest()
+        
         # Always save to new location
         keys_path = Path(CONFIG_API_KEYS_PATH)
+        if digest == _LAST_WRITE['digest']:
+            try:
+                if os.stat(keys_path).st_mtime_ns == _LAST_WRITE['mtime_ns']:
+                    return
+            except FileNotFoundError:
+                pass
+        
+        _CACHE['mtime_ns'] = 0
         keys_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(keys_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        # Set restrictive permissions
-        keys_path.chmod(0o600)
+        # Write atomically with restrictive permissions
+        write_file_atomic(keys_path, payload, permissions=0o600)
+        
+        # Keep the just-written data as the cached copy
+        mtime_ns = os.stat(keys_path).st_mtime_ns
+        _LAST_WRITE.update(digest=digest, mtime_ns=mtime_ns)
+        _CACHE.update(path=keys_path, mtime_ns=mtime_ns, data=data)
     except Exception as e:
         logger.error(f"Error saving API keys: {e}")
 
 
-def hash_api_key(api_key: str) -> Optional[str]:
+def _is_bcrypt_hash(hashed_key: str) -> bool:
+    """Check whether a stored hash is a legacy bcrypt hash."""
+    return hashed_key.startswith('$2')
+
+
+def hash_api_key(api_key: str) -> str:
     """
-    Hash an API key using bcrypt.
+    Hash an API key using HMAC-SHA256 under the server-side pepper.
+    
+    API keys carry 256 bits of entropy, so a keyed hash resists offline
+    attack as well as bcrypt does while costing microseconds to verify.
     
     Args:
         api_key: The API key to hash
         
     Returns:
-        str: The hashed API key, or None if bcrypt is not available
+        str: The hex-encoded hashed API key
+        
+    Raises:
+        RuntimeError: If the pepper is unavailable, e.g. because the auth
+            configuration couldn't be read; hashing under any other key
+            would produce hashes that never verify
     """
-    if not BCRYPT_AVAILABLE:
-        logger.error("bcrypt not available - API key creation disabled for security")
-        return None
-    
-    try:
-        hashed = bcrypt.hashpw(api_key.encode('utf-8'), bcrypt.gensalt())
-        return hashed.decode('utf-8')
-    except Exception as e:
-        logger.error(f"Error hashing API key: {e}")
-        return None
+    pepper = load_auth_config().get('api_key_pepper')
+    if not pepper:
+        raise RuntimeError('API key pepper is unavailable; check the authentication configuration')
+    return hmac.new(pepper.encode('utf-8'), api_key.encode('utf-8'), hashlib.sha256).hexdigest()
 
 
-def verify_api_key_hash(api_key: str, hashed_key: str) -> bool:
+def verify_api_key_hash(api_key: str, hashed_key: str, digest: Optional[str] = None) -> bool:
     """
     Verify an API key against its hash.
     
+    Keys created before the switch to HMAC are stored as bcrypt hashes and
+    are checked with bcrypt when it is available.
+    
     Args:
         api_key: The plain text API key
         hashed_key: The hashed API key
+        digest: The key's hash_api_key() result, if already computed
         
     Returns:
         bool: True if the key matches, False otherwise
     """
+    if not _is_bcrypt_hash(hashed_key):
+        if digest is None:
+            digest = hash_api_key(api_key)
+        return hmac.compare_digest(digest, hashed_key)
+    
     if not BCRYPT_AVAILABLE:
-        # Fallback to plain text comparison (not secure)
-        return api_key == hashed_key
+        logger.error("bcrypt not available - cannot verify legacy API key")
+        return False
     
     try:
         return bcrypt.checkpw(api_key.encode('utf-8'), hashed_key.encode('utf-8'))
@@ -127,8 +229,7 @@ def generate_api_key() -> str:
         str: The generated API key with prefix
     """
     # Generate a secure random token
-    random_part = secrets.token_urlsafe(32)
-    return f"{API_KEY_PREFIX}{random_part}"
+    return API_KEY_PREFIX + secrets.token_urlsafe(32)
 
 
 def create_api_key(username: str, name: str, description: str = '', 
@@ -144,6 +245,9 @@ def create_api_key(username: str, name: str, description: str = '',
         
     Returns:
         dict: The created API key information (including the plain key)
+        
+    Raises:
+        RuntimeError: If the API key pepper is unavailable
     """
     # Generate the key
     api_key = generate_api_key()
@@ -151,9 +255,7 @@ def create_api_key(username: str, name: str, description: str = '',
     
     # Hash the key for storage
     hashed_key = hash_api_key(api_key)
-    if hashed_key is None:
-        logger.error("Cannot create API key: bcrypt is required but not available")
-        raise RuntimeError("API key creation requires bcrypt to be installed")
+    lookup = _lookup_for_hash(hashed_key)
     
     # Create key metadata
     key_data = {
@@ -162,6 +264,7 @@ def create_api_key(username: str, name: str, description: str = '',
         'name': name,
         'description': description,
         'hashed_key': hashed_key,
+        'lookup': lookup,
         'created_at': datetime.utcnow().isoformat(),
         'last_used_at': None,
         'expires_at': expires_at,
@@ -169,9 +272,10 @@ def create_api_key(username: str, name: str, description: str = '',
     }
     
     # Save to storage
-    data = load_api_keys()
-    data['keys'].append(key_data)
-    save_api_keys(data)
+    with _KEYS_LOCK:
+        data = load_api_keys()
+        data['keys'][lookup] = key_data
+        save_api_keys(data)
     
     logger.info(f"Created API key '{name}' for user: {username}")
     
@@ -186,10 +290,82 @@ def create_api_key(username: str, name: str, description: str = '',
     }
 
 
+def _record_last_used(key_data: dict):
+    """Update a key's last_used_at in memory and queue it for writing."""
+    timestamp = datetime.utcnow().isoformat()
+    key_data['last_used_at'] = timestamp
+    with _pending_lock:
+        _pending_last_used[key_data['id']] = timestamp
+
+
+@_with_keys_lock
+def flush_last_used():
+    """Write queued last_used_at updates to the keys file in one save."""
+    with _pending_lock:
+        if not _pending_last_used:
+            return
+        pending = dict(_pending_last_used)
+        _pending_last_used.clear()
+    
+    data = load_api_keys()
+    for key_data in data['keys'].values():
+        timestamp = pending.get(key_data['id'])
+        if timestamp is not None:
+            key_data['last_used_at'] = timestamp
+    save_api_keys(data)
+
+
+async def _flush_last_used_loop():
+    """Periodically persist queued last_used_at updates."""
+    while True:
+        await asyncio.sleep(LAST_USED_FLUSH_INTERVAL)
+        try:
+            flush_last_used()
+        except Exception as e:
+            logger.error(f"Error flushing API key usage: {e}")
+
+
+async def start_last_used_flusher(app):
+    """aiohttp startup hook: begin flushing last_used_at updates."""
+    app['api_key_flusher'] = asyncio.create_task(_flush_last_used_loop())
+
+
+async def stop_last_used_flusher(app):
+    """aiohttp cleanup hook: stop the flusher and write any pending updates."""
+    task = app.get('api_key_flusher')
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    flush_last_used()
+
+
+def _is_key_usable(key_data: dict) -> bool:
+    """Check that a stored API key is neither revoked nor expired."""
+    if key_data.get('revoked', False):
+        return False
+    
+    if key_data.get('expires_at'):
+        try:
+            expires = datetime.fromisoformat(key_data['expires_at'])
+            if datetime.utcnow() > expires:
+                return False
+        except Exception:
+            pass
+    
+    return True
+
+
 def verify_api_key(api_key: str) -> Optional[Dict[str, Any]]:
     """
     Verify an API key and return associated user information.
     
+    Fails closed: no key verifies while the API key pepper is unavailable.
+    The keys lock is held only around reads and updates of the keys data,
+    so HMAC and bcrypt checks on worker threads run in parallel.
+    
     Args:
         api_key: The API key to verify
         
@@ -199,39 +375,93 @@ def verify_api_key(api_key: str) -> Optional[Dict[str, Any]]:
     if not api_key or not api_key.startswith(API_KEY_PREFIX):
         return None
     
-    data = load_api_keys()
+    cache_key = hashlib.sha256(api_key.encode('utf-8')).digest()
+    now = time.monotonic()
     
-    for key_data in data['keys']:
-        # Skip revoked keys
-        if key_data.get('revoked', False):
-            continue
-        
-        # Check expiration
-        if key_data.get('expires_at'):
-            try:
-                expires = datetime.fromisoformat(key_data['expires_at'])
-                if datetime.utcnow() > expires:
-                    continue
-            except Exception:
-                pass
+    # Serve repeat verifications from the cache, skipping the hash check,
+    # as long as the key is still present, unrevoked and unexpired
+    with _KEYS_LOCK:
+        cached = _VERIFY_CACHE.get(cache_key)
+        if cached is not None:
+            cached_at, lookup, result = cached
+            key_data = load_api_keys()['keys'].get(lookup)
+            if now - cached_at < VERIFY_CACHE_TTL and key_data is not None and _is_key_usable(key_data):
+                _VERIFY_CACHE.move_to_end(cache_key)
+                _record_last_used(key_data)
+                return dict(result)
+            _VERIFY_CACHE.pop(cache_key, None)
+    
+    try:
+        digest = hash_api_key(api_key)
+    except RuntimeError as e:
+        logger.error(f"Cannot verify API key: {e}")
+        return None
+    
+    lookup = _lookup_for_hash(digest)
+    
+    # Snapshot the candidate hashes, then check them without the lock
+    with _KEYS_LOCK:
+        keys = load_api_keys()['keys']
+        key_data = keys.get(lookup)
+        if key_data is not None:
+            candidates = [(lookup, key_data['hashed_key'])]
+        else:
+            # Fall back to a scan over keys created before the lookup index
+            # existed; a match is re-indexed below
+            candidates = [(legacy_id, candidate['hashed_key'])
+                          for legacy_id, candidate in keys.items()
+                          if not candidate.get('lookup') and not candidate.get('revoked', False)]
+    
+    match = next(((index, hashed_key) for index, hashed_key in candidates
+                  if verify_api_key_hash(api_key, hashed_key, digest)), None)
+    if match is None:
+        logger.warning("Invalid or revoked API key attempted")
+        return None
+    index, hashed_key = match
+    
+    with _KEYS_LOCK:
+        data = load_api_keys()
+        keys = data['keys']
+        key_data = keys.get(index)
+        if key_data is None and index != lookup:
+            # Another thread re-indexed the legacy key in the meantime
+            index = lookup
+            key_data = keys.get(lookup)
+        # The key may have been deleted or changed while it was checked
+        if key_data is None or key_data['hashed_key'] != hashed_key or not _is_key_usable(key_data):
+            logger.warning("Invalid or revoked API key attempted")
+            return None
         
-        # Verify the key
-        if verify_api_key_hash(api_key, key_data['hashed_key']):
-            # Update last used timestamp
-            key_data['last_used_at'] = datetime.utcnow().isoformat()
+        changed = False
+        if index != lookup:
+            del keys[index]
+            key_data['lookup'] = lookup
+            keys[lookup] = key_data
+            changed = True
+        if _is_bcrypt_hash(hashed_key):
+            # Upgrade legacy bcrypt hashes to HMAC now that the plain key is known
+            key_data['hashed_key'] = digest
+            changed = True
+        if changed:
             save_api_keys(data)
-            
-            logger.info(f"Valid API key used by user: {key_data['username']}")
-            return {
-                'username': key_data['username'],
-                'key_id': key_data['id'],
-                'key_name': key_data['name']
-            }
+        
+        # Update last used timestamp (persisted by flush_last_used)
+        _record_last_used(key_data)
+        
+        result = {
+            'username': key_data['username'],
+            'key_id': key_data['id'],
+            'key_name': key_data['name']
+        }
+        _VERIFY_CACHE[cache_key] = (now, lookup, result)
+        if len(_VERIFY_CACHE) > VERIFY_CACHE_MAX:
+            _VERIFY_CACHE.popitem(last=False)
     
-    logger.warning("Invalid or revoked API key attempted")
-    return None
+    logger.info(f"Valid API key used by user: {result['username']}")
+    return dict(result)
 
 
+@_with_keys_lock
 def list_user_api_keys(username: str) -> List[Dict[str, Any]]:
     """
     List all API keys for a user (without the actual keys).
@@ -245,7 +475,7 @@ def list_user_api_keys(username: str) -> List[Dict[str, Any]]:
     data = load_api_keys()
     user_keys = []
     
-    for key_data in data['keys']:
+    for key_data in data['keys'].values():
         if key_data['username'] == username:
             # Return metadata without the hashed key
             user_keys.append({
@@ -262,6 +492,7 @@ def list_user_api_keys(username: str) -> List[Dict[str, Any]]:
     return user_keys
 
 
+@_with_keys_lock
 def revoke_api_key(key_id: str, username: str) -> bool:
     """
     Revoke an API key.
@@ -275,11 +506,12 @@ def revoke_api_key(key_id: str, username: str) -> bool:
     """
     data = load_api_keys()
     
-    for key_data in data['keys']:
+    for key_data in data['keys'].values():
         if key_data['id'] == key_id and key_data['username'] == username:
             key_data['revoked'] = True
             key_data['revoked_at'] = datetime.utcnow().isoformat()
             save_api_keys(data)
+            _VERIFY_CACHE.clear()
             logger.info(f"Revoked API key '{key_data['name']}' for user: {username}")
             return True
     
@@ -287,6 +519,7 @@ def revoke_api_key(key_id: str, username: str) -> bool:
     return False
 
 
+@_with_keys_lock
 def delete_api_key(key_id: str, username: str) -> bool:
     """
     Delete an API key permanently.
@@ -300,12 +533,14 @@ def delete_api_key(key_id: str, username: str) -> bool:
     """
     data = load_api_keys()
     
-    original_count = len(data['keys'])
-    data['keys'] = [k for k in data['keys'] 
-                    if not (k['id'] == key_id and k['username'] == username)]
+    keys = data['keys']
+    index = next((lookup for lookup, k in keys.items()
+                  if k['id'] == key_id and k['username'] == username), None)
     
-    if len(data['keys']) < original_count:
+    if index is not None:
+        del keys[index]
         save_api_keys(data)
+        _VERIFY_CACHE.clear()
         logger.info(f"Deleted API key {key_id} for user: {username}")
         return True
     
@@ -313,6 +548,7 @@ def delete_api_key(key_id: str, username: str) -> bool:
     return False
 
 
+@_with_keys_lock
 def update_api_key(key_id: str, username: str, name: Optional[str] = None, 
                     description: Optional[str] = None) -> bool:
     """
@@ -329,7 +565,7 @@ def update_api_key(key_id: str, username: str, name: Optional[str] = None,
     """
     data = load_api_keys()
     
-    for key_data in data['keys']:
+    for key_data in data['keys'].values():
         if key_data['id'] == key_id and key_data['username'] == username:
             if name is not None:
                 key_data['name'] = name
@@ -337,6 +573,7 @@ def update_api_key(key_id: str, username: str, name: Optional[str] = None,
                 key_data['description'] = description
             key_data['updated_at'] = datetime.utcnow().isoformat()
             save_api_keys(data)
+            _VERIFY_CACHE.clear()
             logger.info(f"Updated API key {key_id} for user: {username}")
             return True
     
@@ -5,9 +5,12 @@ Handles JWT token generation, validation, and session management
 for web UI authentication.
 """
 
+import hashlib
 import logging
+import os
 import secrets
-import json
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, Dict, Any
@@ -17,6 +20,8 @@ from ..config_loader import (
     AUTH_CONFIG_PATH as CONFIG_AUTH_PATH,
     DEFAULT_AUTH_CONFIG
 )
+from ..utils.file_operations import write_file_atomic
+from ..utils.json_utils import json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -44,47 +49,155 @@ def _get_auth_config_path():
 AUTH_CONFIG_PATH = _get_auth_config_path()
 
 
+# Parsed auth config, reused until the file's mtime changes on disk
+_CFG_CACHE = {'path': None, 'mtime_ns': 0, 'cfg': None}
+
+# Digest and mtime of the last config we wrote, to skip no-op saves
+_LAST_WRITE = {'digest': None, 'mtime_ns': None}
+
+
+def _count_hmac_api_keys() -> int:
+    """
+    Count stored API keys hashed under the API key pepper.
+    
+    Reads the keys file directly, since the api_keys module depends on
+    this one.
+    """
+    for path in (get_config_file_path('api_keys'), get_config_file_path('api_keys', use_legacy=True)):
+        try:
+            keys = json_loads(Path(path).read_bytes()).get('keys') or {}
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.warning(f"Could not check existing API keys: {e}")
+            return 0
+        if isinstance(keys, dict):
+            keys = keys.values()
+        # Legacy bcrypt hashes don't depend on the pepper
+        return sum(1 for key in keys if not key.get('hashed_key', '').startswith('$2'))
+    return 0
+
+
+def _generate_api_key_pepper() -> str:
+    """Generate a new API key pepper, logging an error if keys depend on the old one."""
+    orphaned = _count_hmac_api_keys()
+    if orphaned:
+        logger.error(
+            f"Generated a new API key pepper while {orphaned} API key(s) hashed under the "
+            f"previous pepper exist; those keys will no longer verify and must be recreated"
+        )
+    return secrets.token_hex(32)
+
+
 def load_auth_config() -> dict:
-    """Load authentication configuration from file."""
+    """
+    Load authentication configuration from file.
+    
+    A missing JWT secret or API key pepper is generated and saved. Every
+    HMAC-hashed API key is tied to the pepper it was created under, so a
+    new pepper makes those keys stop verifying; if any exist in
+    api_keys.json, an error is logged when the pepper is replaced.
+    """
     config_path = Path(_get_auth_config_path())
     
     # Create default config if it doesn't exist
-    if not config_path.exists():
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
         config_path.parent.mkdir(parents=True, exist_ok=True)
-        config = DEFAULT_AUTH_CONFIG.copy()
-        # Generate a secure JWT secret
+        config = dict(DEFAULT_AUTH_CONFIG)
+        # Generate a secure JWT secret and API key lookup pepper
         config['jwt_secret'] = secrets.token_urlsafe(64)
+        config['api_key_pepper'] = _generate_api_key_pepper()
         save_auth_config(config)
         logger.info("Created new authentication configuration with generated JWT secret")
         return config
     
+    if _CFG_CACHE['path'] == config_path and _CFG_CACHE['mtime_ns'] == mtime_ns:
+        return _CFG_CACHE['cfg']
+    
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-            # Ensure JWT secret exists
-            if not config.get('jwt_secret'):
-                config['jwt_secret'] = secrets.token_urlsafe(64)
-                save_auth_config(config)
-            return config
+        config = json_loads(config_path.read_bytes())
     except Exception as e:
         logger.error(f"Error loading auth config: {e}")
-        return DEFAULT_AUTH_CONFIG
+        return dict(DEFAULT_AUTH_CONFIG)
+    
+    # Ensure JWT secret and API key pepper exist
+    changed = False
+    if not config.get('jwt_secret'):
+        config['jwt_secret'] = secrets.token_urlsafe(64)
+        changed = True
+    if not config.get('api_key_pepper'):
+        config['api_key_pepper'] = _generate_api_key_pepper()
+        changed = True
+    if changed:
+        save_auth_config(config)
+    else:
+        _CFG_CACHE.update(path=config_path, mtime_ns=mtime_ns, cfg=config)
+    return config
 
 
 def save_auth_config(config: dict):
-    """Save authentication configuration to file."""
+    """Save authentication configuration to file, skipping the write if nothing changed."""
+    global _JWT_PARAMS
+    _JWT_PARAMS = None
+    _VERIFY_CACHE.clear()
     try:
+        payload = json_dumps(config)
+        digest = hashlib.sha256(payload).digest()
+        
         # Always save to new location
         config_path = Path(CONFIG_AUTH_PATH)
+        if digest == _LAST_WRITE['digest']:
+            try:
+                if os.stat(config_path).st_mtime_ns == _LAST_WRITE['mtime_ns']:
+                    return
+            except FileNotFoundError:
+                pass
+        
+        _CFG_CACHE['mtime_ns'] = 0
         config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
-        # Set restrictive permissions
-        config_path.chmod(0o600)
+        # Write atomically with restrictive permissions
+        write_file_atomic(config_path, payload, permissions=0o600)
+        
+        # Keep the just-written config as the cached copy
+        mtime_ns = os.stat(config_path).st_mtime_ns
+        _LAST_WRITE.update(digest=digest, mtime_ns=mtime_ns)
+        _CFG_CACHE.update(path=config_path, mtime_ns=mtime_ns, cfg=config)
     except Exception as e:
         logger.error(f"Error saving auth config: {e}")
 
 
+# (config, secret, [algorithm]) resolved from the current auth config
+_JWT_PARAMS: Optional[tuple] = None
+
+# Recently verified tokens: sha256(token) -> (cached_until, exp, payload).
+# Cleared whenever the signing parameters change.
+VERIFY_CACHE_MAX = 10000
+VERIFY_CACHE_TTL = 10  # seconds
+_VERIFY_CACHE: 'OrderedDict[bytes, tuple]' = OrderedDict()
+
+
+def _get_jwt_params() -> tuple:
+    """
+    Get the JWT signing secret and algorithm list.
+    
+    Resolved once per loaded auth config, so repeated calls only pay for the
+    config cache check.
+    
+    Returns:
+        tuple: (secret, [algorithm])
+    """
+    global _JWT_PARAMS
+    config = load_auth_config()
+    params = _JWT_PARAMS
+    if params is None or params[0] is not config:
+        params = (config, config['jwt_secret'], [config.get('jwt_algorithm', 'HS256')])
+        _JWT_PARAMS = params
+        _VERIFY_CACHE.clear()
+    return params[1], params[2]
+
+
 def generate_token(username: str, additional_claims: Optional[Dict[str, Any]] = None) -> Optional[str]:
     """
     Generate a JWT token for a user.
@@ -119,11 +232,8 @@ def generate_token(username: str, additional_claims: Optional[Dict[str, Any]] =
             payload.update(additional_claims)
         
         # Generate token
-        token = jwt.encode(
-            payload,
-            config['jwt_secret'],
-            algorithm=config.get('jwt_algorithm', 'HS256')
-        )
+        secret, algorithms = _get_jwt_params()
+        token = jwt.encode(payload, secret, algorithm=algorithms[0])
         
         logger.info(f"Generated JWT token for user: {username}")
         return token
@@ -136,6 +246,10 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verify and decode a JWT token.
     
+    Successful verifications are cached for up to VERIFY_CACHE_TTL seconds
+    (never past the token's expiry), so repeat requests with the same token
+    skip the signature check. The returned payload must not be modified.
+    
     Args:
         token: The JWT token to verify
         
@@ -147,14 +261,23 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
         return None
     
     try:
-        config = load_auth_config()
+        secret, algorithms = _get_jwt_params()
         
-        payload = jwt.decode(
-            token,
-            config['jwt_secret'],
-            algorithms=[config.get('jwt_algorithm', 'HS256')]
-        )
+        cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.monotonic()
+        cached = _VERIFY_CACHE.get(cache_key)
+        if cached is not None:
+            cached_until, exp, payload = cached
+            if now < cached_until and (exp is None or time.time() < exp):
+                _VERIFY_CACHE.move_to_end(cache_key)
+                return payload
+            _VERIFY_CACHE.pop(cache_key, None)
         
+        payload = jwt.decode(token, secret, algorithms=algorithms)
+        
+        _VERIFY_CACHE[cache_key] = (now + VERIFY_CACHE_TTL, payload.get('exp'), payload)
+        if len(_VERIFY_CACHE) > VERIFY_CACHE_MAX:
+            _VERIFY_CACHE.popitem(last=False)
         return payload
     except jwt.ExpiredSignatureError:
         logger.warning("JWT token verification failed: token expired")
@@ -181,6 +304,27 @@ def refresh_token(old_token: str) -> Optional[str]:
     if not payload:
         return None
     
+    return refresh_from_claims(payload)
+
+
+def refresh_from_claims(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Issue a new JWT token from the claims of an already verified token.
+    
+    Lets callers that hold verified claims (e.g. from the auth middleware)
+    refresh without decoding the token a second time.
+    
+    Args:
+        payload: The verified token payload
+        
+    Returns:
+        str: A new JWT token, or None if the claims are unusable or expired
+    """
+    # Claims may come from a cached verification, so check expiry again
+    exp = payload.get('exp')
+    if exp is not None and exp <= time.time():
+        return None
+    
     # Extract username and any custom claims
     username = payload.get('username')
     if not username:
@@ -5,23 +5,62 @@ Provides aiohttp middleware to protect API endpoints with
 JWT token or API key authentication.
 """
 
+import asyncio
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from aiohttp import web
-from typing import Callable, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from .jwt_auth import verify_token
 from .api_keys import verify_api_key
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
-# Endpoints that don't require authentication
+# Endpoints that don't require authentication; credentials are not checked
 PUBLIC_ENDPOINTS = [
     '/api/auth/login',
-    '/api/auth/verify',  # Needs to check but not block
     '/api/firstrun',
 ]
 
-# Endpoints that can use public access (for initial setup)
-OPTIONAL_AUTH_ENDPOINTS = []
+# Endpoints that check credentials when present but don't block without them
+OPTIONAL_AUTH_ENDPOINTS = [
+    '/api/auth/verify',
+]
+
+# Failed API key checks per client address: address -> (count, window_start).
+# Once a client exceeds the limit inside the window, its API key attempts are
+# rejected with 429 before any verification work is done. Public routes and
+# JWT requests are never blocked.
+AUTH_FAILURE_LIMIT = 5
+AUTH_FAILURE_WINDOW = 60  # seconds
+_fail_counters: Dict[str, Tuple[int, float]] = {}
+
+# The backend listens on loopback behind nginx, which passes the real client
+# address in X-Real-IP
+_LOOPBACK_ADDRESSES = frozenset(('127.0.0.1', '::1'))
+
+# Bounded pool for API key verification, which touches the keys file and may
+# still need bcrypt for keys created before the switch to HMAC
+_AUTH_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='auth')
+
+# Precompiled matchers: exact paths plus sub-path prefixes, so each check is
+# one set lookup and one str.startswith call over a tuple of prefixes
+_PUBLIC_EXACT = frozenset(PUBLIC_ENDPOINTS)
+_PUBLIC_PREFIXES = tuple(p + '/' for p in PUBLIC_ENDPOINTS)
+_OPTIONAL_EXACT = frozenset(OPTIONAL_AUTH_ENDPOINTS)
+_OPTIONAL_PREFIXES = tuple(p + '/' for p in OPTIONAL_AUTH_ENDPOINTS)
+
+# Exact path -> auth policy ('public', 'optional'), so most requests resolve
+# their policy with a single dict lookup
+POLICY_PUBLIC = 'public'
+POLICY_OPTIONAL = 'optional'
+POLICY_REQUIRED = 'required'
+_ROUTE_POLICY: Dict[str, str] = {
+    **{p: POLICY_OPTIONAL for p in OPTIONAL_AUTH_ENDPOINTS},
+    **{p: POLICY_PUBLIC for p in PUBLIC_ENDPOINTS},
+}
 
 
 def extract_token_from_request(request: web.Request) -> Optional[str]:
@@ -33,25 +72,31 @@ def extract_token_from_request(request: web.Request) -> Optional[str]:
     2. X-API-Key: <key>
     3. Query parameter: token=<token> (for WebSocket connections)
     
+    A Bearer token is also stored on the request, see get_bearer_token().
+    
     Args:
         request: The aiohttp request object
         
     Returns:
         tuple: (token, token_type) where token_type is 'jwt' or 'api_key'
     """
+    headers = request.headers
+    
     # Check Authorization header for Bearer token (JWT)
-    auth_header = request.headers.get('Authorization', '')
-    if auth_header.startswith('Bearer '):
-        token = auth_header[7:]  # Remove 'Bearer ' prefix
-        return (token, 'jwt')
+    auth_header = headers.get('Authorization')
+    if auth_header is not None:
+        token = auth_header.removeprefix('Bearer ')
+        if len(token) != len(auth_header):
+            request['bearer'] = token
+            return (token, 'jwt')
     
     # Check X-API-Key header
-    api_key = request.headers.get('X-API-Key', '')
+    api_key = headers.get('X-API-Key')
     if api_key:
         return (api_key, 'api_key')
     
     # Check query parameter for token (used by WebSocket connections)
-    token = request.query.get('token', '')
+    token = request.query.get('token')
     if token:
         return (token, 'jwt')
     
@@ -60,18 +105,32 @@ def extract_token_from_request(request: web.Request) -> Optional[str]:
 
 def is_public_endpoint(path: str) -> bool:
     """Check if an endpoint is public (doesn't require auth)."""
-    for public_path in PUBLIC_ENDPOINTS:
-        if path == public_path or path.startswith(public_path + '/'):
-            return True
-    return False
+    return path in _PUBLIC_EXACT or path.startswith(_PUBLIC_PREFIXES)
 
 
 def is_optional_auth_endpoint(path: str) -> bool:
     """Check if an endpoint has optional authentication."""
-    for optional_path in OPTIONAL_AUTH_ENDPOINTS:
-        if path == optional_path or path.startswith(optional_path + '/'):
-            return True
-    return False
+    return path in _OPTIONAL_EXACT or path.startswith(_OPTIONAL_PREFIXES)
+
+
+def get_route_policy(path: str) -> str:
+    """
+    Resolve the authentication policy for a request path.
+    
+    Args:
+        path: The request path
+        
+    Returns:
+        str: POLICY_PUBLIC, POLICY_OPTIONAL or POLICY_REQUIRED
+    """
+    policy = _ROUTE_POLICY.get(path)
+    if policy is not None:
+        return policy
+    if path.startswith(_PUBLIC_PREFIXES):
+        return POLICY_PUBLIC
+    if path.startswith(_OPTIONAL_PREFIXES):
+        return POLICY_OPTIONAL
+    return POLICY_REQUIRED
 
 
 async def authenticate_request(request: web.Request) -> Optional[dict]:
@@ -89,6 +148,11 @@ async def authenticate_request(request: web.Request) -> Optional[dict]:
     if not token:
         return None
     
+    return await _verify_credentials(token, token_type)
+
+
+async def _verify_credentials(token: str, token_type: str) -> Optional[dict]:
+    """Verify an extracted JWT or API key and build the user information."""
     if token_type == 'jwt':
         # Verify JWT token
         payload = verify_token(token)
@@ -100,8 +164,9 @@ async def authenticate_request(request: web.Request) -> Optional[dict]:
             }
     
     elif token_type == 'api_key':
-        # Verify API key
-        key_info = verify_api_key(token)
+        # Verify API key off the event loop
+        loop = asyncio.get_running_loop()
+        key_info = await loop.run_in_executor(_AUTH_EXECUTOR, verify_api_key, token)
         if key_info:
             return {
                 'username': key_info['username'],
@@ -113,6 +178,107 @@ async def authenticate_request(request: web.Request) -> Optional[dict]:
     return None
 
 
+def _client_address(request: web.Request) -> Optional[str]:
+    """
+    Get the address failed credential checks are counted against.
+    
+    Requests proxied by nginx arrive from loopback, so the X-Real-IP header
+    it sets is used for those; direct connections use the peer address.
+    
+    Args:
+        request: The aiohttp request object
+        
+    Returns:
+        str: The client address, or None if unknown
+    """
+    remote = request.remote
+    if remote in _LOOPBACK_ADDRESSES:
+        return request.headers.get('X-Real-IP') or remote
+    return remote
+
+
+def _is_rate_limited(remote: Optional[str], now: float) -> bool:
+    """Check whether a client has too many recent failed credential checks."""
+    entry = _fail_counters.get(remote)
+    if entry is None:
+        return False
+    count, window_start = entry
+    if now - window_start >= AUTH_FAILURE_WINDOW:
+        _fail_counters.pop(remote, None)
+        return False
+    return count > AUTH_FAILURE_LIMIT
+
+
+def _record_auth_failure(remote: str, now: float):
+    """Count a failed credential check against a client address."""
+    entry = _fail_counters.get(remote)
+    if entry is None or now - entry[1] >= AUTH_FAILURE_WINDOW:
+        # Drop expired entries before the table grows without bound
+        if len(_fail_counters) >= 4096:
+            for key, (_, start) in list(_fail_counters.items()):
+                if now - start >= AUTH_FAILURE_WINDOW:
+                    del _fail_counters[key]
+        _fail_counters[remote] = (1, now)
+    else:
+        _fail_counters[remote] = (entry[0] + 1, entry[1])
+
+
+async def _verify_tracked(request: web.Request, token: str, token_type: str, now: float) -> Optional[dict]:
+    """Verify credentials, counting API key failures against the client address."""
+    user_info = await _verify_credentials(token, token_type)
+    # Expired or stale JWTs from a browser session are not counted, so a
+    # polling UI with an old token doesn't lock itself out of logging in
+    if user_info is None and token_type == 'api_key':
+        address = _client_address(request)
+        if address:
+            _record_auth_failure(address, now)
+    return user_info
+
+
+async def _authenticate_tracked(request: web.Request) -> Optional[dict]:
+    """
+    Authenticate a request, counting failed API key checks.
+    
+    Every request is verified again; verify_token() and verify_api_key()
+    keep their own caches, which honour expiry and revocation.
+    """
+    token, token_type = extract_token_from_request(request)
+    
+    if not token:
+        return None
+    
+    return await _verify_tracked(request, token, token_type, time.monotonic())
+
+
+def _rate_limited_response(request: web.Request) -> Optional[web.Response]:
+    """
+    Reject an API key attempt from a client with too many recent failures.
+    
+    Only requests carrying an API key are checked, so a client guessing keys
+    can't lock other users out of logging in or using their sessions.
+    
+    Args:
+        request: The aiohttp request object
+        
+    Returns:
+        web.Response: A 429 response, or None if the request may proceed
+    """
+    if not _fail_counters or extract_token_from_request(request)[1] != 'api_key':
+        return None
+    address = _client_address(request)
+    if not _is_rate_limited(address, time.monotonic()):
+        return None
+    logger.warning(f"Rate-limited API key request to {request.path} from {address}")
+    return json_response(
+        {
+            'status': 'error',
+            'message': 'Too many failed authentication attempts. Please try again later.'
+        },
+        status=429,
+        headers={'Retry-After': str(AUTH_FAILURE_WINDOW)}
+    )
+
+
 @web.middleware
 async def auth_middleware(request: web.Request, handler: Callable) -> web.Response:
     """
@@ -128,27 +294,31 @@ async def auth_middleware(request: web.Request, handler: Callable) -> web.Respon
     Returns:
         web.Response: The response from the handler or an error response
     """
-    # Check if endpoint is public
-    if is_public_endpoint(request.path):
-        # Still try to authenticate but don't block
-        user_info = await authenticate_request(request)
-        if user_info:
-            request['user'] = user_info
+    policy = get_route_policy(request.path)
+    
+    # Public endpoints go straight to the handler without reading credentials
+    if policy == POLICY_PUBLIC:
         return await handler(request)
     
-    # Check if endpoint has optional authentication
-    if is_optional_auth_endpoint(request.path):
-        user_info = await authenticate_request(request)
+    # Reject API key attempts from clients with too many recent failures
+    rejected = _rate_limited_response(request)
+    if rejected is not None:
+        return rejected
+    
+    # Optional endpoints authenticate when credentials are present but don't block
+    if policy == POLICY_OPTIONAL:
+        user_info = await _authenticate_tracked(request)
         if user_info:
             request['user'] = user_info
+            request['username'] = user_info['username']
         return await handler(request)
     
     # For all other endpoints, require authentication
-    user_info = await authenticate_request(request)
+    user_info = await _authenticate_tracked(request)
     
     if not user_info:
         logger.warning(f"Unauthorized access attempt to {request.path}")
-        return web.json_response(
+        return json_response(
             {
                 'status': 'error',
                 'message': 'Authentication required. Please provide a valid JWT token or API key.'
@@ -158,6 +328,7 @@ async def auth_middleware(request: web.Request, handler: Callable) -> web.Respon
     
     # Attach user info to request for use in handlers
     request['user'] = user_info
+    request['username'] = user_info['username']
     
     # Log authenticated access
     logger.debug(f"Authenticated request to {request.path} by {user_info['username']} via {user_info['auth_type']}")
@@ -179,7 +350,7 @@ def require_admin(handler: Callable) -> Callable:
         user_info = request.get('user')
         
         if not user_info:
-            return web.json_response(
+            return json_response(
                 {
                     'status': 'error',
                     'message': 'Authentication required'
@@ -188,10 +359,9 @@ def require_admin(handler: Callable) -> Callable:
             )
         
         # Check if user is admin
-        from .user_management import is_admin
-        if not is_admin(user_info['username']):
+        if not is_current_user_admin(request):
             logger.warning(f"User {user_info['username']} attempted to access admin-only endpoint: {request.path}")
-            return web.json_response(
+            return json_response(
                 {
                     'status': 'error',
                     'message': 'Admin privileges required'
@@ -221,11 +391,53 @@ def get_username(request: web.Request) -> Optional[str]:
     """
     Get the current authenticated username from the request.
     
+    The middleware stores the username when it authenticates the request,
+    so this is a single lookup.
+    
     Args:
         request: The aiohttp request object
         
     Returns:
         str: Username if authenticated, None otherwise
     """
-    user = get_current_user(request)
-    return user.get('username') if user else None
+    return request.get('username')
+
+
+def get_bearer_token(request: web.Request) -> Optional[str]:
+    """
+    Get the token from the request's Authorization: Bearer header.
+    
+    The middleware stores the token when it extracts the credentials.
+    
+    Args:
+        request: The aiohttp request object
+        
+    Returns:
+        str: The Bearer token, or None if the request didn't send one
+    """
+    return request.get('bearer')
+
+
+def is_current_user_admin(request: web.Request) -> bool:
+    """
+    Check whether the current authenticated user has the admin role.
+    
+    The result is stored on the request, so handlers and decorators can
+    check it repeatedly without looking up the role again.
+    
+    Args:
+        request: The aiohttp request object
+        
+    Returns:
+        bool: True if the user is authenticated and an admin
+    """
+    admin = request.get('is_admin')
+    if admin is None:
+        username = get_username(request)
+        if username:
+            from .user_management import is_admin
+            admin = is_admin(username)
+        else:
+            admin = False
+        request['is_admin'] = admin
+    return admin
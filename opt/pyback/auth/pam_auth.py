@@ -5,9 +5,14 @@ Provides integration with Linux PAM (Pluggable Authentication Modules)
 to authenticate users against system credentials.
 """
 
+import asyncio
+import functools
 import logging
+import os
 import pwd
 import grp
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +24,10 @@ except ImportError:
     PAM_AVAILABLE = False
     logger.warning("python3-pam not available. Install with: sudo apt install python3-pam")
 
+# Worker threads for PAM conversations. Handles are not pooled: PAM modules
+# keep per-transaction state, so each attempt gets its own pam_start/pam_end.
+_PAM_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='pam')
+
 
 def authenticate_user(username: str, password: str) -> bool:
     """
@@ -73,6 +82,91 @@ def authenticate_user(username: str, password: str) -> bool:
         return False
 
 
+async def authenticate_user_async(username: str, password: str) -> bool:
+    """
+    Authenticate a user using PAM without blocking the event loop.
+    
+    PAM conversations can take hundreds of milliseconds (and longer after a
+    failed attempt), so they run on a small dedicated thread pool.
+    
+    Args:
+        username: The username to authenticate
+        password: The password to check
+        
+    Returns:
+        bool: True if authentication successful, False otherwise
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_PAM_EXECUTOR, authenticate_user, username, password)
+
+
+# How long user/group lookups are cached, in seconds
+USER_CACHE_TTL = 60
+
+
+def _ttl_bucket() -> int:
+    """Return the current cache time bucket; lookups expire when it changes."""
+    return int(time.monotonic() // USER_CACHE_TTL)
+
+
+@functools.lru_cache(maxsize=256)
+def _getpwnam(username: str, _bucket: int):
+    """Cached pwd.getpwnam returning None for unknown users."""
+    try:
+        return pwd.getpwnam(username)
+    except KeyError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _getgrgid_name(gid: int, _bucket: int):
+    """Cached group name lookup by GID, or None if the group is unknown."""
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _getgrnam_gid(groupname: str, _bucket: int):
+    """Cached GID lookup by group name, or None if the group is unknown."""
+    try:
+        return grp.getgrnam(groupname).gr_gid
+    except KeyError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _get_user_gids(username: str, _bucket: int) -> tuple:
+    """Cached GIDs of all groups a user belongs to, primary group first."""
+    user = _getpwnam(username, _bucket)
+    if user is None:
+        return ()
+    # getgrouplist resolves membership through NSS in a single call,
+    # instead of enumerating every group on the system
+    return tuple(os.getgrouplist(username, user.pw_gid))
+
+
+@functools.lru_cache(maxsize=256)
+def _get_user_groups(username: str, _bucket: int) -> tuple:
+    """Cached group names for a user, primary group first."""
+    names = []
+    for gid in _get_user_gids(username, _bucket):
+        name = _getgrgid_name(gid, _bucket)
+        if name is not None and name not in names:
+            names.append(name)
+    return tuple(names)
+
+
+def clear_user_cache():
+    """Drop cached user and group lookups after accounts are changed."""
+    _getpwnam.cache_clear()
+    _getgrgid_name.cache_clear()
+    _getgrnam_gid.cache_clear()
+    _get_user_gids.cache_clear()
+    _get_user_groups.cache_clear()
+
+
 def user_exists(username: str) -> bool:
     """
     Check if a system user exists.
@@ -83,11 +177,7 @@ def user_exists(username: str) -> bool:
     Returns:
         bool: True if user exists, False otherwise
     """
-    try:
-        pwd.getpwnam(username)
-        return True
-    except KeyError:
-        return False
+    return _getpwnam(username, _ttl_bucket()) is not None
 
 
 def get_user_info(username: str) -> dict:
@@ -101,18 +191,17 @@ def get_user_info(username: str) -> dict:
         dict: User information including uid, gid, home, shell
         None if user doesn't exist
     """
-    try:
-        user = pwd.getpwnam(username)
-        return {
-            'username': user.pw_name,
-            'uid': user.pw_uid,
-            'gid': user.pw_gid,
-            'home': user.pw_dir,
-            'shell': user.pw_shell,
-            'gecos': user.pw_gecos
-        }
-    except KeyError:
+    user = _getpwnam(username, _ttl_bucket())
+    if user is None:
         return None
+    return {
+        'username': user.pw_name,
+        'uid': user.pw_uid,
+        'gid': user.pw_gid,
+        'home': user.pw_dir,
+        'shell': user.pw_shell,
+        'gecos': user.pw_gecos
+    }
 
 
 def get_user_groups(username: str) -> list:
@@ -126,16 +215,7 @@ def get_user_groups(username: str) -> list:
         list: List of group names
     """
     try:
-        user_groups = [g.gr_name for g in grp.getgrall() if username in g.gr_mem]
-        # Also add the user's primary group
-        try:
-            user = pwd.getpwnam(username)
-            primary_group = grp.getgrgid(user.pw_gid).gr_name
-            if primary_group not in user_groups:
-                user_groups.insert(0, primary_group)
-        except (KeyError, AttributeError):
-            pass
-        return user_groups
+        return list(_get_user_groups(username, _ttl_bucket()))
     except Exception as e:
         logger.error(f"Error getting groups for user {username}: {e}")
         return []
@@ -152,8 +232,8 @@ def is_user_in_group(username: str, groupname: str) -> bool:
     Returns:
         bool: True if user is in the group, False otherwise
     """
-    try:
-        group = grp.getgrnam(groupname)
-        return username in group.gr_mem or pwd.getpwnam(username).pw_gid == group.gr_gid
-    except (KeyError, AttributeError):
+    bucket = _ttl_bucket()
+    target_gid = _getgrnam_gid(groupname, bucket)
+    if target_gid is None:
         return False
+    return target_gid in _get_user_gids(username, bucket)
@@ -5,26 +5,45 @@ Handles creation, modification, and deletion of system users for Starlight.
 Requires appropriate sudo permissions or running as root.
 """
 
+import atexit
+import copy
+import functools
+import grp
 import logging
+import os
+import pwd
+import shutil
 import subprocess
-import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 
 from ..config_loader import get_config_file_path, USERS_METADATA_PATH as CONFIG_USERS_PATH
+from ..utils.file_operations import write_file_atomic
+from ..utils.json_utils import json_dumps, json_loads
+from .pam_auth import clear_user_cache, user_exists
 
 logger = logging.getLogger(__name__)
 
 # Configuration paths - use config_loader paths with fallback
+@functools.lru_cache(maxsize=1)
 def _get_users_metadata_path():
-    """Get the users metadata path with fallback to legacy."""
+    """
+    Get the users metadata path with fallback to legacy.
+    
+    The result is cached; saving always writes the new location, so the
+    cache is cleared after each write.
+    """
     new_path = CONFIG_USERS_PATH
     legacy_path = get_config_file_path('users', use_legacy=True)
     
     # Return new path if it exists, otherwise check legacy
-    if Path(new_path).exists():
+    if os.path.exists(new_path):
         return new_path
-    if Path(legacy_path).exists():
+    if os.path.exists(legacy_path):
         return legacy_path
     # Default to new path for new installations
     return new_path
@@ -37,66 +56,227 @@ STARLIGHT_GROUP = 'starlight-users'
 # System users to exclude from listing (UIDs < 1000)
 MIN_UID = 1000
 
+# Account management tools, resolved once instead of on every call
+_GROUPADD = shutil.which('groupadd') or '/usr/sbin/groupadd'
+_USERADD = shutil.which('useradd') or '/usr/sbin/useradd'
+_USERDEL = shutil.which('userdel') or '/usr/sbin/userdel'
+_USERMOD = shutil.which('usermod') or '/usr/sbin/usermod'
+_CHPASSWD = shutil.which('chpasswd') or '/usr/sbin/chpasswd'
 
-def load_users_metadata() -> dict:
-    """Load users metadata from storage file."""
+# useradd exit status for a username, or a group of that name, that is already taken
+USERADD_EXIT_USER_EXISTS = 9
+
+# Set once the starlight-users group is known to exist
+_starlight_group_ensured = False
+
+# Parsed metadata file, reused until the file's mtime or size changes on disk.
+# 'dirty' marks data saved in memory but not yet written to the file.
+_CACHE = {'path': None, 'mtime_ns': 0, 'size': -1, 'data': None, 'dirty': False}
+_CACHE_LOCK = threading.Lock()
+
+# Metadata saves are written by a background thread after a short delay,
+# so a burst of updates results in a single file write
+METADATA_WRITE_DELAY = 0.1  # seconds
+METADATA_RETRY_DELAY = 5  # seconds between attempts after a failed write
+_WRITE_LOCK = threading.Lock()
+_write_event = threading.Event()
+_writer_thread = None
+
+
+def _now_iso() -> str:
+    """Return the current local time as an ISO 8601 string with UTC offset."""
+    return datetime.now().astimezone().isoformat(timespec='seconds')
+
+
+def _get_cached_metadata() -> dict:
+    """
+    Return the cached users metadata, reloading it if the file changed.
+    
+    The returned dict is shared and must not be modified; use
+    load_users_metadata() to get a copy that can be changed and saved.
+    """
     metadata_path = Path(_get_users_metadata_path())
     
-    if not metadata_path.exists():
+    # Unwritten changes are newer than whatever is on disk
+    with _CACHE_LOCK:
+        if _CACHE['dirty']:
+            return _CACHE['data']
+    
+    try:
+        st = os.stat(metadata_path)
+    except FileNotFoundError:
         metadata_path.parent.mkdir(parents=True, exist_ok=True)
-        default_data = {'users': {}}
-        save_users_metadata(default_data)
-        return default_data
+        save_users_metadata({'users': {}})
+        return _CACHE['data']
+    
+    with _CACHE_LOCK:
+        if (_CACHE['path'] == metadata_path and _CACHE['mtime_ns'] == st.st_mtime_ns
+                and _CACHE['size'] == st.st_size):
+            return _CACHE['data']
     
     try:
-        with open(metadata_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
+        data = json_loads(metadata_path.read_bytes())
+    except (OSError, ValueError) as e:
+        # ValueError covers JSON decode errors from both json and orjson
         logger.error(f"Error loading users metadata: {e}")
         return {'users': {}}
+    
+    with _CACHE_LOCK:
+        # Don't replace changes saved while the file was being read
+        if _CACHE['dirty']:
+            return _CACHE['data']
+        _CACHE.update(path=metadata_path, mtime_ns=st.st_mtime_ns, size=st.st_size, data=data)
+    return data
 
 
-def save_users_metadata(data: dict):
-    """Save users metadata to storage file."""
-    try:
-        # Always save to new location
-        metadata_path = Path(CONFIG_USERS_PATH)
-        metadata_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(metadata_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        # Set restrictive permissions
-        metadata_path.chmod(0o600)
-    except Exception as e:
-        logger.error(f"Error saving users metadata: {e}")
+def load_users_metadata() -> dict:
+    """
+    Load users metadata from storage file.
+    
+    The parsed file is cached until its mtime or size changes. Callers get
+    their own copy, so they can modify it before passing it to
+    save_users_metadata().
+    """
+    return copy.deepcopy(_get_cached_metadata())
+
+
+def _write_pending_metadata() -> bool:
+    """
+    Write the pending metadata snapshot to disk, if there is one.
+    
+    Returns:
+        bool: False if the write failed; the snapshot then stays pending
+    """
+    with _WRITE_LOCK:
+        with _CACHE_LOCK:
+            if not _CACHE['dirty']:
+                return True
+            data = _CACHE['data']
+        
+        try:
+            # Always save to new location
+            metadata_path = Path(CONFIG_USERS_PATH)
+            metadata_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write atomically with restrictive permissions, so readers never
+            # see a truncated file
+            payload = json_dumps(data)
+            write_file_atomic(metadata_path, payload, permissions=0o600, fsync=True)
+            st = os.stat(metadata_path)
+            _get_users_metadata_path.cache_clear()
+        except Exception as e:
+            logger.error(f"Error saving users metadata: {e}")
+            return False
+        
+        with _CACHE_LOCK:
+            # A newer snapshot may have been queued while writing; it stays
+            # pending and the writer thread will pick it up
+            if _CACHE['data'] is data:
+                _CACHE.update(path=metadata_path, mtime_ns=st.st_mtime_ns,
+                              size=st.st_size, dirty=False)
+        return True
+
+
+def _metadata_writer_loop():
+    """Background loop that writes queued metadata after a short delay."""
+    while True:
+        _write_event.wait()
+        time.sleep(METADATA_WRITE_DELAY)
+        _write_event.clear()
+        if not _write_pending_metadata():
+            # Keep the snapshot queued and try again later
+            time.sleep(METADATA_RETRY_DELAY)
+            _write_event.set()
+
+
+def _ensure_writer_thread():
+    """Start the metadata writer thread if it isn't running. Call with _CACHE_LOCK held."""
+    global _writer_thread
+    if _writer_thread is None or not _writer_thread.is_alive():
+        _writer_thread = threading.Thread(
+            target=_metadata_writer_loop,
+            name='users-metadata-writer',
+            daemon=True
+        )
+        _writer_thread.start()
+
+
+def flush_users_metadata() -> bool:
+    """
+    Write any queued users metadata to disk immediately.
+    
+    Returns:
+        bool: True if nothing is left unwritten
+    """
+    return _write_pending_metadata()
+
+
+def save_users_metadata(data: dict, flush: bool = False) -> bool:
+    """
+    Save users metadata to storage file.
+    
+    The data becomes visible to load_users_metadata() immediately, while the
+    file write is queued so that a burst of updates results in one write.
+    
+    Args:
+        data: The full users metadata
+        flush: Write to disk before returning, for security-sensitive changes
+        
+    Returns:
+        bool: False if a flushed write failed. The data stays queued and the
+            background writer retries it, but callers must not report the
+            change as saved.
+    """
+    snapshot = copy.deepcopy(data)
+    with _CACHE_LOCK:
+        _CACHE.update(path=Path(CONFIG_USERS_PATH), data=snapshot, dirty=True)
+    
+    if flush and flush_users_metadata():
+        return True
+    
+    with _CACHE_LOCK:
+        _ensure_writer_thread()
+    _write_event.set()
+    return not flush
+
+
+atexit.register(flush_users_metadata)
 
 
 def ensure_starlight_group() -> bool:
     """
     Ensure the starlight-users group exists.
     
+    The result is remembered for the lifetime of the process once the
+    group exists, so repeated user creation doesn't check again.
+    
     Returns:
         bool: True if group exists or was created successfully
     """
+    global _starlight_group_ensured
+    if _starlight_group_ensured:
+        return True
+    
     try:
         # Check if group exists
-        result = subprocess.run(
-            ['getent', 'group', STARLIGHT_GROUP],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
+        try:
+            grp.getgrnam(STARLIGHT_GROUP)
+            _starlight_group_ensured = True
             return True
+        except KeyError:
+            pass
         
         # Create the group
         result = subprocess.run(
-            ['groupadd', STARLIGHT_GROUP],
-            capture_output=True,
+            [_GROUPADD, STARLIGHT_GROUP],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True
         )
         
         if result.returncode == 0:
             logger.info(f"Created group: {STARLIGHT_GROUP}")
+            clear_user_cache()
+            _starlight_group_ensured = True
             return True
         else:
             logger.error(f"Failed to create group {STARLIGHT_GROUP}: {result.stderr}")
@@ -106,6 +286,39 @@ def ensure_starlight_group() -> bool:
         return False
 
 
+def _is_valid_chpasswd_entry(username: str, password: str) -> bool:
+    """Check that a username and password fit on one chpasswd input line."""
+    return ':' not in username and '\n' not in username and '\n' not in password
+
+
+def _run_chpasswd(credentials: List[Tuple[str, str]]) -> subprocess.CompletedProcess:
+    """
+    Set passwords for one or more users with a single chpasswd call.
+    
+    Args:
+        credentials: List of (username, password) pairs
+        
+    Returns:
+        CompletedProcess: The chpasswd result
+        
+    Raises:
+        ValueError: If a username or password would break the line format
+    """
+    lines = []
+    for username, password in credentials:
+        if not _is_valid_chpasswd_entry(username, password):
+            raise ValueError(f"Invalid characters in credentials for user {username!r}")
+        lines.append(f"{username}:{password}\n")
+    
+    return subprocess.run(
+        [_CHPASSWD],
+        input=''.join(lines),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+
+
 def create_user(username: str, password: str, role: str = 'user', 
                 full_name: str = '', shell: str = '/bin/bash') -> Dict[str, any]:
     """
@@ -119,39 +332,49 @@ def create_user(username: str, password: str, role: str = 'user',
         shell: User's shell (default: /bin/bash)
         
     Returns:
-        dict: Result with status and message
+        dict: Result with status and message. If the user already exists,
+            status is 'error' and 'exists' is True.
     """
+    # Reject credentials chpasswd can't take before the account is created,
+    # so a bad password can't leave an account without one behind
+    if not _is_valid_chpasswd_entry(username, password):
+        return {'status': 'error', 'message': 'Invalid characters in username or password'}
+    
     try:
         # Ensure starlight group exists
         if not ensure_starlight_group():
             return {'status': 'error', 'message': 'Failed to ensure starlight-users group exists'}
         
         # Create the user
-        cmd = ['useradd', '-m', '-s', shell, '-c', full_name or username]
+        cmd = [_USERADD, '-m', '-s', shell, '-c', full_name or username]
         
         # Add to starlight-users group
         cmd.extend(['-G', STARLIGHT_GROUP])
         
         cmd.append(username)
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
         
+        if result.returncode == USERADD_EXIT_USER_EXISTS:
+            # Exit 9 also means a group with this name exists, so confirm
+            # the user with a fresh lookup before reporting a duplicate
+            clear_user_cache()
+            if user_exists(username):
+                return {'status': 'error', 'message': f'User {username} already exists', 'exists': True}
         if result.returncode != 0:
             logger.error(f"Failed to create user {username}: {result.stderr}")
             return {'status': 'error', 'message': f'Failed to create user: {result.stderr}'}
         
+        clear_user_cache()
+        
         # Set password
-        password_result = subprocess.run(
-            ['chpasswd'],
-            input=f"{username}:{password}",
-            capture_output=True,
-            text=True
-        )
+        password_result = _run_chpasswd([(username, password)])
         
         if password_result.returncode != 0:
             logger.error(f"Failed to set password for {username}: {password_result.stderr}")
             # Try to clean up the created user
-            subprocess.run(['userdel', '-r', username], capture_output=True)
+            subprocess.run([_USERDEL, '-r', username],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             return {'status': 'error', 'message': 'Failed to set user password'}
         
         # Save user metadata
@@ -160,11 +383,7 @@ def create_user(username: str, password: str, role: str = 'user',
             'role': role,
             'full_name': full_name,
             'created_by': 'system',
-            'created_at': subprocess.run(
-                ['date', '-Iseconds'],
-                capture_output=True,
-                text=True
-            ).stdout.strip()
+            'created_at': _now_iso()
         }
         save_users_metadata(metadata)
         
@@ -188,22 +407,25 @@ def delete_user(username: str, remove_home: bool = True) -> Dict[str, any]:
         dict: Result with status and message
     """
     try:
-        cmd = ['userdel']
+        cmd = [_USERDEL]
         if remove_home:
             cmd.append('-r')
         cmd.append(username)
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
         
         if result.returncode != 0:
             logger.error(f"Failed to delete user {username}: {result.stderr}")
             return {'status': 'error', 'message': f'Failed to delete user: {result.stderr}'}
         
+        clear_user_cache()
+        
         # Remove from metadata
         metadata = load_users_metadata()
         if username in metadata['users']:
             del metadata['users'][username]
-            save_users_metadata(metadata)
+            if not save_users_metadata(metadata, flush=True):
+                return {'status': 'error', 'message': f'User {username} deleted, but saving users metadata failed'}
         
         logger.info(f"Deleted user: {username}")
         return {'status': 'success', 'message': f'User {username} deleted successfully'}
@@ -225,12 +447,7 @@ def change_password(username: str, new_password: str) -> Dict[str, any]:
         dict: Result with status and message
     """
     try:
-        result = subprocess.run(
-            ['chpasswd'],
-            input=f"{username}:{new_password}",
-            capture_output=True,
-            text=True
-        )
+        result = _run_chpasswd([(username, new_password)])
         
         if result.returncode != 0:
             logger.error(f"Failed to change password for {username}: {result.stderr}")
@@ -244,6 +461,24 @@ def change_password(username: str, new_password: str) -> Dict[str, any]:
         return {'status': 'error', 'message': str(e)}
 
 
+def _load_group_memberships() -> Tuple[Dict[int, str], Dict[str, List[str]]]:
+    """
+    Read the group database in a single pass.
+    
+    Returns:
+        tuple: (gid -> group name, username -> supplementary group names)
+    """
+    gid_to_name = {}
+    user_groups = defaultdict(list)
+    
+    for group in grp.getgrall():
+        gid_to_name[group.gr_gid] = group.gr_name
+        for member in group.gr_mem:
+            user_groups[member].append(group.gr_name)
+    
+    return gid_to_name, user_groups
+
+
 def list_users(include_system: bool = False) -> List[Dict[str, any]]:
     """
     List all users on the system.
@@ -255,68 +490,41 @@ def list_users(include_system: bool = False) -> List[Dict[str, any]]:
         list: List of user information dictionaries
     """
     try:
-        # Get all users from /etc/passwd
-        result = subprocess.run(
-            ['getent', 'passwd'],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            logger.error("Failed to get user list")
-            return []
-        
+        users_metadata = _get_cached_metadata()['users']
+        gid_to_name, user_groups = _load_group_memberships()
         users = []
-        metadata = load_users_metadata()
+        append = users.append
         
-        for line in result.stdout.strip().split('\n'):
-            if not line:
-                continue
-            
-            parts = line.split(':')
-            if len(parts) < 7:
-                continue
-            
-            username = parts[0]
-            uid = int(parts[2])
-            gid = int(parts[3])
-            gecos = parts[4]
-            home = parts[5]
-            shell = parts[6]
+        # Get all users from the passwd database
+        for entry in pwd.getpwall():
+            uid = entry.pw_uid
             
-            # Skip system users if requested
+            # Skip system users before doing any other work for them
             if not include_system and uid < MIN_UID:
                 continue
             
-            # Get user's groups
-            group_result = subprocess.run(
-                ['groups', username],
-                capture_output=True,
-                text=True
-            )
-            groups = []
-            if group_result.returncode == 0:
-                # Format: "username : group1 group2 group3"
-                groups_str = group_result.stdout.strip()
-                if ':' in groups_str:
-                    groups = groups_str.split(':', 1)[1].strip().split()
+            username = entry.pw_name
+            gid = entry.pw_gid
+            
+            # Get user's groups, primary group first as `groups` reports them
+            primary = gid_to_name.get(gid)
+            groups = [primary] if primary else []
+            groups.extend(g for g in user_groups.get(username, ()) if g != primary)
             
             # Get metadata if available
-            user_metadata = metadata['users'].get(username, {})
+            user_metadata = users_metadata.get(username)
             
-            user_info = {
+            append({
                 'username': username,
                 'uid': uid,
                 'gid': gid,
-                'full_name': gecos,
-                'home': home,
-                'shell': shell,
+                'full_name': entry.pw_gecos,
+                'home': entry.pw_dir,
+                'shell': entry.pw_shell,
                 'groups': groups,
-                'role': user_metadata.get('role', 'user'),
+                'role': user_metadata.get('role', 'user') if user_metadata else 'user',
                 'in_starlight_group': STARLIGHT_GROUP in groups
-            }
-            
-            users.append(user_info)
+            })
         
         return users
     
@@ -349,20 +557,24 @@ def update_user_metadata(username: str, role: Optional[str] = None,
         
         if full_name is not None:
             metadata['users'][username]['full_name'] = full_name
-            # Also update system GECOS field
-            subprocess.run(
-                ['usermod', '-c', full_name, username],
-                capture_output=True,
-                text=True
-            )
-        
-        metadata['users'][username]['updated_at'] = subprocess.run(
-            ['date', '-Iseconds'],
-            capture_output=True,
-            text=True
-        ).stdout.strip()
-        
-        save_users_metadata(metadata)
+            # Also update system GECOS field, unless it already matches
+            try:
+                current_gecos = pwd.getpwnam(username).pw_gecos
+            except KeyError:
+                current_gecos = None
+            if current_gecos != full_name:
+                subprocess.run(
+                    [_USERMOD, '-c', full_name, username],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+                clear_user_cache()
+        
+        metadata['users'][username]['updated_at'] = _now_iso()
+        
+        # Role changes must be on disk before reporting success
+        if not save_users_metadata(metadata, flush=role is not None):
+            return {'status': 'error', 'message': 'Failed to save users metadata'}
         
         logger.info(f"Updated metadata for user: {username}")
         return {'status': 'success', 'message': 'User metadata updated successfully'}
@@ -385,11 +597,12 @@ def get_user_role(username: str) -> str:
     Returns:
         str: The user's role ('admin' or 'user')
     """
-    metadata = load_users_metadata()
-    
-    # Check if user has an explicit role in metadata
-    if username in metadata['users'] and 'role' in metadata['users'][username]:
-        return metadata['users'][username]['role']
+    # Read-only lookup, so the shared cached metadata is used without copying
+    user_metadata = _get_cached_metadata()['users'].get(username)
+    if user_metadata:
+        role = user_metadata.get('role')
+        if role is not None:
+            return role
     
     # Automatically grant admin role to root user
     if username == 'root':
@@ -13,6 +13,7 @@ import os
 # Import dynamic configuration loader
 from .config_loader import (
     # Configuration functions
+    get_all_configs,
     get_storage_config,
     get_system_config,
     get_vm_storage_path,
@@ -125,76 +126,48 @@ GIT_REPO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 
 # --- For direct import compatibility, expose commonly used values ---
-# Note: These are loaded once at import time. For runtime updates, use the functions above.
+# Note: These are loaded once, on first access. For runtime updates, use the functions above.
 
-def _get_default_storage_path():
-    """Get default storage path at module load time."""
+def _load_import_time_values() -> dict:
+    """Compute the compatibility constants from a single load of the config files."""
     try:
-        return get_vm_storage_path()
+        configs = get_all_configs()
     except Exception:
-        return '/var/lib/libvirt/images'  # Fallback default
-
-
-def _get_default_pool_name():
-    """Get default pool name at module load time."""
-    try:
-        return get_default_pool_name()
-    except Exception:
-        return 'default'  # Fallback default
-
-
-def _get_network_mode():
-    """Get network mode at module load time."""
-    try:
-        return get_network_mode()
-    except Exception:
-        return 'bridge'  # Fallback default
-
-
-def _get_bridge_name():
-    """Get bridge name at module load time."""
-    try:
-        return get_bridge_name()
-    except Exception:
-        return 'br0'  # Fallback default
-
-
-def _get_nat_network_name():
-    """Get NAT network name at module load time."""
-    try:
-        return get_nat_network_name()
-    except Exception:
-        return 'default'  # Fallback default
-
-
-def _get_service_name():
-    """Get service name at module load time."""
-    try:
-        return get_service_name()
-    except Exception:
-        return 'starlight-backend'  # Fallback default
-
-
-def _get_iso_storage_path():
-    """Get ISO storage path at module load time."""
-    try:
-        return get_iso_storage_path()
-    except Exception:
-        # Fallback: derive from VM storage path using proper path manipulation
-        try:
-            vm_path = get_vm_storage_path()
-            parent_dir = os.path.dirname(vm_path)
-            return os.path.join(parent_dir, 'isos')
-        except Exception:
-            return '/var/lib/libvirt/isos'  # Final fallback
-
-
-# Initialize with dynamic values - these can be imported directly
-# WARNING: These are loaded once. For always-current values, use the functions.
-DEFAULT_STORAGE_PATH = _get_default_storage_path()
-DEFAULT_POOL_NAME = _get_default_pool_name()
-ISO_STORAGE_PATH = _get_iso_storage_path()
-NETWORK_MODE = _get_network_mode()
-BRIDGE_NAME = _get_bridge_name()
-NAT_NETWORK_NAME = _get_nat_network_name()
-SERVICE_NAME = _get_service_name()
+        configs = {}
+    storage = configs.get('storage') or {}
+    system = configs.get('system') or {}
+    
+    storage_path = storage.get('vm_storage_path') or '/var/lib/libvirt/images'
+    return {
+        'DEFAULT_STORAGE_PATH': storage_path,
+        'DEFAULT_POOL_NAME': storage.get('default_pool_name') or 'default',
+        # Fall back to an 'isos' directory next to the VM storage path
+        'ISO_STORAGE_PATH': (storage.get('iso_storage_path')
+                             or os.path.join(os.path.dirname(storage_path), 'isos')),
+        'NETWORK_MODE': system.get('network_mode') or 'bridge',
+        'BRIDGE_NAME': system.get('bridge_name') or 'br0',
+        'NAT_NETWORK_NAME': system.get('nat_network_name') or 'default',
+        'SERVICE_NAME': system.get('service_name') or 'starlight-backend',
+    }
+
+
+_LAZY_CONSTANTS = frozenset({
+    'DEFAULT_STORAGE_PATH', 'DEFAULT_POOL_NAME', 'ISO_STORAGE_PATH',
+    'NETWORK_MODE', 'BRIDGE_NAME', 'NAT_NETWORK_NAME', 'SERVICE_NAME',
+})
+
+
+def __getattr__(name: str):
+    """
+    Load the compatibility constants on first access (PEP 562).
+    
+    Importing this module for static values such as LIBVIRT_URI no longer
+    reads any configuration files. Once loaded, the constants are stored as
+    module globals, so later lookups don't come through here.
+    WARNING: These are loaded once. For always-current values, use the functions.
+    """
+    if name in _LAZY_CONSTANTS:
+        values = _load_import_time_values()
+        globals().update(values)
+        return values[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,77 +8,97 @@ This module provides runtime configuration loading from JSON files with:
 - Backward compatibility with old paths
 """
 
+import asyncio
 import os
-import json
 import logging
-from typing import Dict, Any, Optional
-from pathlib import Path
+import mmap
+import struct
+import threading
+import ctypes
+import ctypes.util
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Optional, Tuple
+from types import MappingProxyType
+
+from .utils.file_operations import write_file_atomic
+from .utils.json_utils import LOADS_ACCEPTS_BUFFER, json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
 # --- Configuration Directory Paths ---
 CONFIG_BASE_DIR = '/etc/starlight'
-CONFIG_DIR = os.path.join(CONFIG_BASE_DIR, 'config')
-DATA_DIR = os.path.join(CONFIG_BASE_DIR, 'data')
-PREFERENCES_DIR = os.path.join(CONFIG_BASE_DIR, 'preferences')
-ROLLBACK_DIR = os.path.join(CONFIG_BASE_DIR, 'rollback_data')
+CONFIG_DIR = f'{CONFIG_BASE_DIR}/config'
+DATA_DIR = f'{CONFIG_BASE_DIR}/data'
+PREFERENCES_DIR = f'{CONFIG_BASE_DIR}/preferences'
+ROLLBACK_DIR = f'{CONFIG_BASE_DIR}/rollback_data'
 
 # --- Configuration File Paths (New Centralized Structure) ---
-SYSTEM_CONFIG_PATH = os.path.join(CONFIG_DIR, 'system.json')
-STORAGE_CONFIG_PATH = os.path.join(CONFIG_DIR, 'storage.json')
-REPOSITORIES_CONFIG_PATH = os.path.join(CONFIG_DIR, 'repositories.json')
-AUTH_CONFIG_PATH = os.path.join(CONFIG_DIR, 'auth.json')
-UPDATE_CONFIG_PATH = os.path.join(CONFIG_DIR, 'update.json')
-NETWORK_CONFIG_PATH = os.path.join(CONFIG_DIR, 'network.json')
-UPDATER_CONFIG_PATH = os.path.join(CONFIG_DIR, 'updater.json')
+SYSTEM_CONFIG_PATH = f'{CONFIG_DIR}/system.json'
+STORAGE_CONFIG_PATH = f'{CONFIG_DIR}/storage.json'
+REPOSITORIES_CONFIG_PATH = f'{CONFIG_DIR}/repositories.json'
+AUTH_CONFIG_PATH = f'{CONFIG_DIR}/auth.json'
+UPDATE_CONFIG_PATH = f'{CONFIG_DIR}/update.json'
+NETWORK_CONFIG_PATH = f'{CONFIG_DIR}/network.json'
+UPDATER_CONFIG_PATH = f'{CONFIG_DIR}/updater.json'
 
 # --- Data File Paths ---
-VM_METADATA_PATH = os.path.join(DATA_DIR, 'vm_metadata.json')
-LXC_METADATA_PATH = os.path.join(DATA_DIR, 'lxc_metadata.json')
-USERS_METADATA_PATH = os.path.join(DATA_DIR, 'users.json')
-API_KEYS_PATH = os.path.join(DATA_DIR, 'api_keys.json')
+VM_METADATA_PATH = f'{DATA_DIR}/vm_metadata.json'
+LXC_METADATA_PATH = f'{DATA_DIR}/lxc_metadata.json'
+USERS_METADATA_PATH = f'{DATA_DIR}/users.json'
+API_KEYS_PATH = f'{DATA_DIR}/api_keys.json'
 
 # --- Legacy Configuration Paths (for backward compatibility) ---
-LEGACY_STORAGE_PATH = os.path.join(CONFIG_BASE_DIR, 'storage.json')
-LEGACY_REPOSITORIES_PATH = os.path.join(CONFIG_BASE_DIR, 'repositories.json')
-LEGACY_AUTH_PATH = os.path.join(CONFIG_BASE_DIR, 'auth.json')
-LEGACY_UPDATE_PATH = os.path.join(CONFIG_BASE_DIR, 'update_config.json')
-LEGACY_VM_METADATA_PATH = os.path.join(CONFIG_BASE_DIR, 'vm_metadata.json')
-LEGACY_LXC_METADATA_PATH = os.path.join(CONFIG_BASE_DIR, 'lxc_metadata.json')
-LEGACY_USERS_PATH = os.path.join(CONFIG_BASE_DIR, 'users.json')
-LEGACY_API_KEYS_PATH = os.path.join(CONFIG_BASE_DIR, 'api_keys.json')
+LEGACY_STORAGE_PATH = f'{CONFIG_BASE_DIR}/storage.json'
+LEGACY_REPOSITORIES_PATH = f'{CONFIG_BASE_DIR}/repositories.json'
+LEGACY_AUTH_PATH = f'{CONFIG_BASE_DIR}/auth.json'
+LEGACY_UPDATE_PATH = f'{CONFIG_BASE_DIR}/update_config.json'
+LEGACY_VM_METADATA_PATH = f'{CONFIG_BASE_DIR}/vm_metadata.json'
+LEGACY_LXC_METADATA_PATH = f'{CONFIG_BASE_DIR}/lxc_metadata.json'
+LEGACY_USERS_PATH = f'{CONFIG_BASE_DIR}/users.json'
+LEGACY_API_KEYS_PATH = f'{CONFIG_BASE_DIR}/api_keys.json'
+
+# Legacy files whose presence means a migration is pending
+_LEGACY_CONFIG_PATHS = (
+    LEGACY_STORAGE_PATH,
+    LEGACY_REPOSITORIES_PATH,
+    LEGACY_AUTH_PATH,
+    LEGACY_UPDATE_PATH,
+)
 
 # --- Other Static Paths ---
-VERSION_FILE_PATH = os.path.join(CONFIG_BASE_DIR, 'version.json')
+VERSION_FILE_PATH = f'{CONFIG_BASE_DIR}/version.json'
 
 # --- Default Configurations ---
-DEFAULT_SYSTEM_CONFIG = {
+# Read-only, so they can be shared without defensive copies; use
+# dict(DEFAULT_...) or {**DEFAULT_..., ...} to get a mutable copy
+DEFAULT_SYSTEM_CONFIG = MappingProxyType({
     'network_mode': 'bridge',
     'bridge_name': 'br0',
     'nat_network_name': 'default',
     'service_name': 'starlight-backend'
-}
+})
 
-DEFAULT_STORAGE_CONFIG = {
+DEFAULT_STORAGE_CONFIG = MappingProxyType({
     'vm_storage_path': '/var/lib/libvirt/images',
     'iso_storage_path': '/var/lib/libvirt/isos',
     'default_pool_name': 'default'
-}
+})
 
-DEFAULT_AUTH_CONFIG = {
+DEFAULT_AUTH_CONFIG = MappingProxyType({
     'jwt_secret': None,  # Will be auto-generated
+    'api_key_pepper': None,  # Will be auto-generated
     'jwt_algorithm': 'HS256',
     'session_timeout_hours': 24,
     'refresh_token_days': 30
-}
+})
 
-DEFAULT_UPDATE_CONFIG = {
+DEFAULT_UPDATE_CONFIG = MappingProxyType({
     'auto_update_enabled': False,
     'check_interval_hours': 24,
     'last_check': None
-}
+})
 
-DEFAULT_NETWORK_CONFIG = {
+DEFAULT_NETWORK_CONFIG = MappingProxyType({
     'mode': 'dhcp',  # 'dhcp' or 'static'
     'hostname': '',
     'ip_address': '',
@@ -86,19 +106,94 @@ DEFAULT_NETWORK_CONFIG = {
     'gateway': '',
     'dns_primary': '8.8.8.8',
     'dns_secondary': '1.1.1.1'
-}
+})
 
 # Default updater configuration
-DEFAULT_UPDATER_CONFIG = {
+DEFAULT_UPDATER_CONFIG = MappingProxyType({
     'repository_url': 'https://github.com/WillProvince/Starlight-Hidden.git',
     'branch': 'main',
     'auto_sync_files': True,
     'auto_update_packages': True,
     'run_update_scripts': True
+})
+
+# --- Configuration Registry ---
+# name -> (path, legacy path, defaults, file permissions); the get/save
+# functions for each type are generated from this table
+_REGISTRY = {
+    # vm_storage_path, iso_storage_path, default_pool_name
+    'storage': (STORAGE_CONFIG_PATH, LEGACY_STORAGE_PATH, DEFAULT_STORAGE_CONFIG, 0o644),
+    # network_mode ('bridge' or 'nat'), bridge_name, nat_network_name, service_name
+    'system': (SYSTEM_CONFIG_PATH, '', DEFAULT_SYSTEM_CONFIG, 0o644),
+    # More restrictive permissions for auth config, which holds secrets
+    'auth': (AUTH_CONFIG_PATH, LEGACY_AUTH_PATH, DEFAULT_AUTH_CONFIG, 0o600),
+    'update': (UPDATE_CONFIG_PATH, LEGACY_UPDATE_PATH, DEFAULT_UPDATE_CONFIG, 0o644),
+    # mode ('dhcp' or 'static'), hostname, ip_address, netmask, gateway, dns_primary, dns_secondary
+    'network': (NETWORK_CONFIG_PATH, '', DEFAULT_NETWORK_CONFIG, 0o644),
+    # repository_url, branch, auto_sync_files, auto_update_packages, run_update_scripts
+    'updater': (UPDATER_CONFIG_PATH, '', DEFAULT_UPDATER_CONFIG, 0o644),
 }
 
+# Files managed by their own modules rather than the registry:
+# name -> (path, legacy path), for get_config_file_path()
+_UNREGISTERED_PATHS = MappingProxyType({
+    'repositories': (REPOSITORIES_CONFIG_PATH, LEGACY_REPOSITORIES_PATH),
+    'vm_metadata': (VM_METADATA_PATH, LEGACY_VM_METADATA_PATH),
+    'lxc_metadata': (LXC_METADATA_PATH, LEGACY_LXC_METADATA_PATH),
+    'users': (USERS_METADATA_PATH, LEGACY_USERS_PATH),
+    'api_keys': (API_KEYS_PATH, LEGACY_API_KEYS_PATH),
+})
+
+# --- Typed Settings Views ---
+# Immutable snapshots of the most frequently read configs; the getters
+# above keep returning dicts because callers modify and serialize them
+
+@dataclass(frozen=True, slots=True)
+class StorageConfig:
+    """Storage settings, see DEFAULT_STORAGE_CONFIG."""
+    vm_storage_path: str
+    iso_storage_path: str
+    default_pool_name: str
+
+
+@dataclass(frozen=True, slots=True)
+class SystemConfig:
+    """System settings, see DEFAULT_SYSTEM_CONFIG."""
+    network_mode: str
+    bridge_name: str
+    nat_network_name: str
+    service_name: str
+
+
 # --- Configuration Cache ---
-_config_cache: Dict[str, Any] = {}
+# cache key -> (file identity, config); see _file_key()
+_config_cache: Dict[str, Tuple[Optional[tuple], Dict[str, Any]]] = {}
+
+# One lock per cache key, so concurrent first reads of a config parse it
+# once while the other callers wait for the result
+_config_locks: Dict[str, threading.Lock] = {}
+_config_locks_guard = threading.Lock()
+
+# cache key -> (config dict the view was built from, settings view)
+_settings_cache: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+
+# Directories already created by _save_config() in this process
+_ensured_dirs: set = set()
+
+# Whether ensure_storage_paths() has created the storage directories
+_storage_paths_ensured = False
+
+# Bumped whenever the config watcher invalidates a cache key, so a load
+# that raced with the change doesn't cache what it read
+_config_generations: Dict[str, int] = {}
+
+# Whether the inotify watcher is running; while it is, cached configs
+# are served without stat()ing their files
+_config_watcher_active = False
+
+# Files at least this large are parsed straight from a read-only mmap
+# instead of being copied into a bytes object first
+MMAP_THRESHOLD = 4096
 
 
 def ensure_config_directories() -> bool:
@@ -111,371 +206,459 @@ def ensure_config_directories() -> bool:
     directories = [CONFIG_DIR, DATA_DIR, PREFERENCES_DIR, ROLLBACK_DIR]
     
     try:
-        for directory in directories:
-            Path(directory).mkdir(parents=True, exist_ok=True)
-            os.chmod(directory, 0o755)
+        os.makedirs(CONFIG_BASE_DIR, mode=0o755, exist_ok=True)
+        # Resolve the base directory once and create its children relative to it
+        base_fd = os.open(CONFIG_BASE_DIR, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for directory in directories:
+                try:
+                    os.mkdir(os.path.basename(directory), 0o755, dir_fd=base_fd)
+                except FileExistsError:
+                    pass
+        finally:
+            os.close(base_fd)
         return True
     except Exception as e:
         logger.error(f"Failed to create configuration directories: {e}")
         return False
 
 
-def _get_config_with_fallback(new_path: str, legacy_path: str, default: Dict[str, Any]) -> Dict[str, Any]:
+def _load_json_file(path: str) -> Any:
+    """
+    Parse a JSON file.
+    
+    The file is sized with fstat() and read with a single read() call.
+    Large files are mapped into memory and handed to orjson without an
+    intermediate copy, when the JSON backend can parse from a buffer.
+    
+    Args:
+        path: Path to the JSON file
+        
+    Returns:
+        The parsed JSON document
+        
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if not LOADS_ACCEPTS_BUFFER or size < MMAP_THRESHOLD:
+            # Config files are replaced atomically, so the size can't change under us
+            return json_loads(os.read(fd, size))
+        with mmap.mmap(fd, 0, prot=mmap.PROT_READ) as mm:
+            with memoryview(mm) as view:
+                return json_loads(view)
+    finally:
+        os.close(fd)
+
+
+def _file_key(new_path: str, legacy_path: str) -> Optional[tuple]:
+    """
+    Identify the config file currently in effect.
+    
+    Args:
+        new_path: The new centralized configuration path
+        legacy_path: The legacy configuration path
+        
+    Returns:
+        tuple: (path, mtime_ns, size, inode) of the first existing file,
+            or None if neither exists
+    """
+    for path in (new_path, legacy_path):
+        if not path:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        return (path, st.st_mtime_ns, st.st_size, st.st_ino)
+    return None
+
+
+def _get_config_lock(cache_key: str) -> threading.Lock:
+    """Get the lock that serializes loading of one cached configuration."""
+    lock = _config_locks.get(cache_key)
+    if lock is None:
+        with _config_locks_guard:
+            lock = _config_locks.setdefault(cache_key, threading.Lock())
+    return lock
+
+
+def _get_config_with_fallback(new_path: str, legacy_path: str, default: Dict[str, Any],
+                              cache_key: Optional[str] = None) -> Dict[str, Any]:
     """
     Load configuration from new path, falling back to legacy path if not found.
     
+    With a cache_key, the parsed configuration is cached and returned
+    again until the config watcher reports a change or, when the watcher
+    isn't running, for as long as the file's path, mtime, size and inode
+    are unchanged.
+    
     Args:
         new_path: The new centralized configuration path
         legacy_path: The legacy configuration path
         default: Default configuration values
+        cache_key: Name to cache the configuration under
         
     Returns:
         dict: The loaded configuration merged with defaults
     """
-    config = default.copy()
-    
-    # Try new path first
-    if os.path.exists(new_path):
-        try:
-            with open(new_path, 'r') as f:
-                loaded = json.load(f)
-                config.update(loaded)
-                return config
-        except Exception as e:
-            logger.warning(f"Error loading config from {new_path}: {e}")
+    if cache_key is None:
+        return _read_config_with_fallback(new_path, legacy_path, default)
+    
+    # The watcher drops changed entries, so anything still cached is current
+    if _config_watcher_active:
+        cached = _config_cache.get(cache_key)
+        if cached is not None:
+            return cached[1]
+    
+    file_key = _file_key(new_path, legacy_path)
+    cached = _config_cache.get(cache_key)
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+    
+    with _get_config_lock(cache_key):
+        # Another thread may have loaded it while we waited for the lock
+        cached = _config_cache.get(cache_key)
+        if cached is not None and cached[0] == file_key:
+            return cached[1]
+        generation = _config_generations.get(cache_key, 0)
+        config = _read_config_with_fallback(new_path, legacy_path, default)
+        if _config_generations.get(cache_key, 0) == generation:
+            _config_cache[cache_key] = (file_key, config)
+    return config
+
+
+def _read_config_with_fallback(new_path: str, legacy_path: str, default: Dict[str, Any]) -> Dict[str, Any]:
+    """Read configuration from disk, falling back to the legacy path and then defaults."""
+    # Try new path first; a missing file is detected by open() itself
+    try:
+        loaded = _load_json_file(new_path)
+        return {**default, **loaded}
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Error loading config from {new_path}: {e}")
     
     # Fall back to legacy path
-    if os.path.exists(legacy_path):
+    if legacy_path:
         try:
-            with open(legacy_path, 'r') as f:
-                loaded = json.load(f)
-                config.update(loaded)
-                logger.info(f"Loaded config from legacy path: {legacy_path}")
-                return config
+            loaded = _load_json_file(legacy_path)
+            config = {**default, **loaded}
+            logger.info(f"Loaded config from legacy path: {legacy_path}")
+            return config
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.warning(f"Error loading config from legacy path {legacy_path}: {e}")
     
-    return config
+    return dict(default)
 
 
-def _save_config(path: str, config: Dict[str, Any], permissions: int = 0o644) -> bool:
+# --- Config File Watcher ---
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_CLOEXEC = 0o2000000
+_IN_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    INOTIFY_AVAILABLE = True
+except (OSError, AttributeError):
+    INOTIFY_AVAILABLE = False
+
+
+def _invalidate_config(cache_key: str):
+    """Drop a cached configuration after its file changed on disk."""
+    _config_generations[cache_key] = _config_generations.get(cache_key, 0) + 1
+    _config_cache.pop(cache_key, None)
+
+
+def _config_watcher_loop(fd: int, watches: Dict[int, Dict[str, str]]):
     """
-    Save configuration to a JSON file.
+    Invalidate cached configurations as inotify reports changes to their files.
     
     Args:
-        path: Path to save the configuration
-        config: Configuration dictionary to save
-        permissions: File permissions (default 0o644)
-        
-    Returns:
-        bool: True if saved successfully
+        fd: inotify file descriptor
+        watches: watch descriptor -> {file name: cache key}
     """
+    global _config_watcher_active
     try:
-        # Ensure directory exists
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(path, 'w') as f:
-            json.dump(config, f, indent=2)
-        
-        os.chmod(path, permissions)
-        return True
+        while True:
+            buf = os.read(fd, 65536)
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, name_len = _INOTIFY_EVENT.unpack_from(buf, offset)
+                offset += _INOTIFY_EVENT.size
+                name = buf[offset:offset + name_len].rstrip(b'\0').decode(errors='replace')
+                offset += name_len
+                
+                if mask & _IN_Q_OVERFLOW:
+                    # Events were lost, so any cached config may be stale
+                    for cache_key in _REGISTRY:
+                        _invalidate_config(cache_key)
+                elif mask & _IN_IGNORED:
+                    # A watched directory is gone; fall back to stat() checks
+                    logger.warning("Config directory watch removed, falling back to polling")
+                    return
+                else:
+                    cache_key = watches.get(wd, {}).get(name)
+                    if cache_key:
+                        _invalidate_config(cache_key)
     except Exception as e:
-        logger.error(f"Failed to save config to {path}: {e}")
-        return False
+        logger.warning(f"Config watcher stopped: {e}")
+    finally:
+        _config_watcher_active = False
+        os.close(fd)
 
 
-def get_storage_config(force_reload: bool = False) -> Dict[str, Any]:
+def start_config_watcher() -> bool:
     """
-    Get storage configuration.
+    Start watching the configuration directories with inotify.
+    
+    While the watcher runs, cached configurations are served without
+    checking their files and are dropped as soon as a file changes.
+    Without inotify, or if a directory can't be watched, the cache keeps
+    validating entries with stat().
     
-    Args:
-        force_reload: If True, bypass cache and reload from disk
-        
     Returns:
-        dict: Storage configuration with keys:
-            - vm_storage_path: Path to VM disk images
-            - iso_storage_path: Path to ISO images
-            - default_pool_name: Default libvirt storage pool name
+        bool: True if the watcher is running
     """
-    cache_key = 'storage'
+    global _config_watcher_active
+    if _config_watcher_active:
+        return True
+    if not INOTIFY_AVAILABLE:
+        return False
     
-    if not force_reload and cache_key in _config_cache:
-        return _config_cache[cache_key]
+    # directory -> {file name: cache key}, for the new and legacy paths
+    files_by_dir: Dict[str, Dict[str, str]] = {}
+    for cache_key, (new_path, legacy_path, _, _) in _REGISTRY.items():
+        for path in (new_path, legacy_path):
+            if path:
+                directory, name = os.path.split(path)
+                files_by_dir.setdefault(directory, {})[name] = cache_key
+    
+    fd = _inotify_init1(_IN_CLOEXEC)
+    if fd < 0:
+        logger.warning(f"inotify unavailable: {os.strerror(ctypes.get_errno())}")
+        return False
     
-    config = _get_config_with_fallback(
-        STORAGE_CONFIG_PATH,
-        LEGACY_STORAGE_PATH,
-        DEFAULT_STORAGE_CONFIG
-    )
+    watches = {}
+    for directory, names in files_by_dir.items():
+        wd = _inotify_add_watch(fd, os.fsencode(directory), _IN_WATCH_MASK)
+        if wd < 0:
+            logger.warning(f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return False
+        watches[wd] = names
     
-    # Ensure paths exist
-    for path_key in ['vm_storage_path', 'iso_storage_path']:
-        path = config.get(path_key)
-        if path:
-            try:
-                Path(path).mkdir(parents=True, exist_ok=True)
-            except Exception as e:
-                logger.warning(f"Could not create storage path {path}: {e}")
+    # Entries cached before the watch existed may already be stale
+    for cache_key in _REGISTRY:
+        _invalidate_config(cache_key)
     
-    _config_cache[cache_key] = config
-    return config
+    _config_watcher_active = True
+    threading.Thread(target=_config_watcher_loop, args=(fd, watches),
+                     name='config-watcher', daemon=True).start()
+    logger.info("Watching configuration files for changes")
+    return True
 
 
-def save_storage_config(config: Dict[str, Any]) -> bool:
+def _cache_saved_config(cache_key: str, path: str, config: Dict[str, Any]):
+    """Cache a just-saved configuration under the identity of its new file."""
+    _config_cache[cache_key] = (_file_key(path, ''), config)
+
+
+def _save_config(path: str, config: Dict[str, Any], permissions: int = 0o644) -> bool:
     """
-    Save storage configuration.
+    Save configuration to a JSON file.
     
     Args:
-        config: Storage configuration dictionary
+        path: Path to save the configuration
+        config: Configuration dictionary to save
+        permissions: File permissions (default 0o644)
         
     Returns:
         bool: True if saved successfully
     """
-    # Merge with defaults to ensure all keys are present
-    full_config = DEFAULT_STORAGE_CONFIG.copy()
-    full_config.update(config)
-    
-    if _save_config(STORAGE_CONFIG_PATH, full_config):
-        _config_cache['storage'] = full_config
+    try:
+        # Ensure directory exists, once per process
+        parent = os.path.dirname(path)
+        if parent not in _ensured_dirs:
+            os.makedirs(parent, exist_ok=True)
+            _ensured_dirs.add(parent)
+        
+        # Write atomically, so readers never see a partially written file
+        write_file_atomic(path, json_dumps(config), permissions=permissions)
         return True
-    return False
+    except Exception as e:
+        logger.error(f"Failed to save config to {path}: {e}")
+        return False
 
 
-def get_system_config(force_reload: bool = False) -> Dict[str, Any]:
+def _make_config_accessors(name: str, description: str):
     """
-    Get system configuration (network, service settings).
+    Build the get and save functions for a configuration type in _REGISTRY.
     
     Args:
-        force_reload: If True, bypass cache and reload from disk
+        name: Configuration type, a key of _REGISTRY
+        description: Short description used in the generated docstrings
         
     Returns:
-        dict: System configuration with keys:
-            - network_mode: 'bridge' or 'nat'
-            - bridge_name: Bridge device name
-            - nat_network_name: NAT network name
-            - service_name: Systemd service name
+        tuple: (getter, saver)
     """
-    cache_key = 'system'
+    new_path, legacy_path, default, permissions = _REGISTRY[name]
     
-    if not force_reload and cache_key in _config_cache:
-        return _config_cache[cache_key]
+    def getter(force_reload: bool = False) -> Dict[str, Any]:
+        config = _get_config_with_fallback(new_path, legacy_path, default, cache_key=name)
+        return dict(config) if force_reload else config
     
-    config = _get_config_with_fallback(
-        SYSTEM_CONFIG_PATH,
-        '',  # No legacy path for system config
-        DEFAULT_SYSTEM_CONFIG
-    )
+    def saver(config: Dict[str, Any]) -> bool:
+        # Merge with defaults to ensure all keys are present
+        full_config = {**default, **config}
+        if _save_config(new_path, full_config, permissions=permissions):
+            _cache_saved_config(name, new_path, full_config)
+            return True
+        return False
     
-    _config_cache[cache_key] = config
-    return config
-
-
-def save_system_config(config: Dict[str, Any]) -> bool:
-    """
-    Save system configuration.
+    getter.__name__ = getter.__qualname__ = f'get_{name}_config'
+    getter.__doc__ = f"""
+    Get {description}.
     
-    Args:
-        config: System configuration dictionary
-        
-    Returns:
-        bool: True if saved successfully
-    """
-    full_config = DEFAULT_SYSTEM_CONFIG.copy()
-    full_config.update(config)
-    
-    if _save_config(SYSTEM_CONFIG_PATH, full_config):
-        _config_cache['system'] = full_config
-        return True
-    return False
-
-
-def get_auth_config(force_reload: bool = False) -> Dict[str, Any]:
-    """
-    Get authentication configuration.
+    The returned dict is shared with other callers and must not be
+    modified. Cached values are refreshed when the file on disk changes.
     
     Args:
-        force_reload: If True, bypass cache and reload from disk
+        force_reload: Return a private copy that the caller may modify
         
     Returns:
-        dict: Authentication configuration
-    """
-    cache_key = 'auth'
-    
-    if not force_reload and cache_key in _config_cache:
-        return _config_cache[cache_key]
-    
-    config = _get_config_with_fallback(
-        AUTH_CONFIG_PATH,
-        LEGACY_AUTH_PATH,
-        DEFAULT_AUTH_CONFIG
-    )
-    
-    _config_cache[cache_key] = config
-    return config
-
-
-def save_auth_config(config: Dict[str, Any]) -> bool:
+        dict: The configuration merged with defaults
     """
-    Save authentication configuration.
+    saver.__name__ = saver.__qualname__ = f'save_{name}_config'
+    saver.__doc__ = f"""
+    Save {description}.
     
     Args:
-        config: Authentication configuration dictionary
+        config: Configuration dictionary; missing keys are filled from defaults
         
     Returns:
         bool: True if saved successfully
     """
-    full_config = DEFAULT_AUTH_CONFIG.copy()
-    full_config.update(config)
-    
-    # Use more restrictive permissions for auth config
-    if _save_config(AUTH_CONFIG_PATH, full_config, permissions=0o600):
-        _config_cache['auth'] = full_config
-        return True
-    return False
+    return getter, saver
 
 
-def get_update_config(force_reload: bool = False) -> Dict[str, Any]:
+get_storage_config, _save_storage_config = _make_config_accessors('storage', 'storage configuration')
+get_system_config, save_system_config = _make_config_accessors(
+    'system', 'system configuration (network, service settings)')
+get_auth_config, save_auth_config = _make_config_accessors('auth', 'authentication configuration')
+get_update_config, save_update_config = _make_config_accessors('update', 'update configuration')
+get_network_config, save_network_config = _make_config_accessors('network', 'network configuration')
+get_updater_config, save_updater_config = _make_config_accessors('updater', 'updater configuration')
+
+
+def ensure_storage_paths() -> None:
     """
-    Get update configuration.
+    Create the VM and ISO storage directories, once per process.
     
-    Args:
-        force_reload: If True, bypass cache and reload from disk
-        
-    Returns:
-        dict: Update configuration
+    Called at startup and again whenever the storage configuration is saved.
     """
-    cache_key = 'update'
-    
-    if not force_reload and cache_key in _config_cache:
-        return _config_cache[cache_key]
+    global _storage_paths_ensured
+    if _storage_paths_ensured:
+        return
     
-    config = _get_config_with_fallback(
-        UPDATE_CONFIG_PATH,
-        LEGACY_UPDATE_PATH,
-        DEFAULT_UPDATE_CONFIG
-    )
-    
-    _config_cache[cache_key] = config
-    return config
+    config = get_storage_config()
+    for path_key in ('vm_storage_path', 'iso_storage_path'):
+        path = config.get(path_key)
+        if path:
+            try:
+                os.makedirs(path, exist_ok=True)
+            except Exception as e:
+                logger.warning(f"Could not create storage path {path}: {e}")
+    _storage_paths_ensured = True
 
 
-def save_update_config(config: Dict[str, Any]) -> bool:
+def save_storage_config(config: Dict[str, Any]) -> bool:
     """
-    Save update configuration.
+    Save storage configuration and create the configured storage paths.
     
     Args:
-        config: Update configuration dictionary
+        config: Configuration dictionary; missing keys are filled from defaults
         
     Returns:
         bool: True if saved successfully
     """
-    full_config = DEFAULT_UPDATE_CONFIG.copy()
-    full_config.update(config)
+    global _storage_paths_ensured
+    if not _save_storage_config(config):
+        return False
     
-    if _save_config(UPDATE_CONFIG_PATH, full_config):
-        _config_cache['update'] = full_config
-        return True
-    return False
+    # The paths may have changed
+    _storage_paths_ensured = False
+    ensure_storage_paths()
+    return True
 
 
-def get_network_config(force_reload: bool = False) -> Dict[str, Any]:
-    """
-    Get network configuration.
-    
-    Args:
-        force_reload: If True, bypass cache and reload from disk
-        
-    Returns:
-        dict: Network configuration with keys:
-            - mode: 'dhcp' or 'static'
-            - hostname: System hostname
-            - ip_address: Static IP address (for static mode)
-            - netmask: Network mask
-            - gateway: Default gateway
-            - dns_primary: Primary DNS server
-            - dns_secondary: Secondary DNS server
-    """
-    cache_key = 'network'
-    
-    if not force_reload and cache_key in _config_cache:
-        return _config_cache[cache_key]
-    
-    config = _get_config_with_fallback(
-        NETWORK_CONFIG_PATH,
-        '',  # No legacy path for network config
-        DEFAULT_NETWORK_CONFIG
-    )
-    
-    _config_cache[cache_key] = config
-    return config
+# Getter for each registered configuration type
+_CONFIG_GETTERS = {
+    'storage': get_storage_config,
+    'system': get_system_config,
+    'auth': get_auth_config,
+    'update': get_update_config,
+    'network': get_network_config,
+    'updater': get_updater_config,
+}
 
 
-def save_network_config(config: Dict[str, Any]) -> bool:
+def get_all_configs(force_reload: bool = False) -> Dict[str, Dict[str, Any]]:
     """
-    Save network configuration.
+    Load every configuration type in one pass.
+    
+    Each file is read at most once and kept in the configuration cache, so
+    later get_*_config() calls are served from memory until the file changes.
     
     Args:
-        config: Network configuration dictionary
+        force_reload: Kept for compatibility; cached values are always
+            refreshed when the file on disk changes
         
     Returns:
-        bool: True if saved successfully
+        dict: Configuration dictionaries keyed by type ('storage', 'system',
+            'auth', 'update', 'network', 'updater')
     """
-    full_config = DEFAULT_NETWORK_CONFIG.copy()
-    full_config.update(config)
-    
-    if _save_config(NETWORK_CONFIG_PATH, full_config):
-        _config_cache['network'] = full_config
-        return True
-    return False
+    return {name: getter(force_reload) for name, getter in _CONFIG_GETTERS.items()}
 
 
-def get_updater_config(force_reload: bool = False) -> Dict[str, Any]:
+async def warm_all_configs(app=None):
     """
-    Get updater configuration.
+    Load every configuration type concurrently on worker threads.
     
-    Args:
-        force_reload: If True, bypass cache and reload from disk
-        
-    Returns:
-        dict: Updater configuration with keys:
-            - repository_url: Git repository URL
-            - branch: Git branch to use
-            - auto_sync_files: Whether to sync files after update
-            - auto_update_packages: Whether to run apt update/upgrade
-            - run_update_scripts: Whether to run update scripts
-    """
-    cache_key = 'updater'
-    
-    if not force_reload and cache_key in _config_cache:
-        return _config_cache[cache_key]
-    
-    config = _get_config_with_fallback(
-        UPDATER_CONFIG_PATH,
-        '',  # No legacy path for updater config
-        DEFAULT_UPDATER_CONFIG
-    )
-    
-    _config_cache[cache_key] = config
-    return config
-
-
-def save_updater_config(config: Dict[str, Any]) -> bool:
-    """
-    Save updater configuration.
+    Starts the config file watcher, fills the configuration cache before
+    the first request needs it and creates the storage directories. Can
+    be registered directly as an aiohttp on_startup handler.
     
     Args:
-        config: Updater configuration dictionary
-        
-    Returns:
-        bool: True if saved successfully
+        app: The aiohttp application (unused)
     """
-    full_config = DEFAULT_UPDATER_CONFIG.copy()
-    full_config.update(config)
+    start_config_watcher()
     
-    if _save_config(UPDATER_CONFIG_PATH, full_config):
-        _config_cache['updater'] = full_config
-        return True
-    return False
+    loop = asyncio.get_running_loop()
+    names = list(_CONFIG_GETTERS)
+    results = await asyncio.gather(
+        *(loop.run_in_executor(None, _CONFIG_GETTERS[name]) for name in names),
+        return_exceptions=True
+    )
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not preload {name} configuration: {result}")
+    
+    await loop.run_in_executor(None, ensure_storage_paths)
 
 
 def get_config_file_path(config_type: str, use_legacy: bool = False) -> str:
@@ -491,23 +674,9 @@ def get_config_file_path(config_type: str, use_legacy: bool = False) -> str:
     Returns:
         str: The configuration file path
     """
-    paths = {
-        'storage': (STORAGE_CONFIG_PATH, LEGACY_STORAGE_PATH),
-        'system': (SYSTEM_CONFIG_PATH, ''),
-        'auth': (AUTH_CONFIG_PATH, LEGACY_AUTH_PATH),
-        'update': (UPDATE_CONFIG_PATH, LEGACY_UPDATE_PATH),
-        'repositories': (REPOSITORIES_CONFIG_PATH, LEGACY_REPOSITORIES_PATH),
-        'vm_metadata': (VM_METADATA_PATH, LEGACY_VM_METADATA_PATH),
-        'lxc_metadata': (LXC_METADATA_PATH, LEGACY_LXC_METADATA_PATH),
-        'users': (USERS_METADATA_PATH, LEGACY_USERS_PATH),
-        'api_keys': (API_KEYS_PATH, LEGACY_API_KEYS_PATH),
-        'network': (NETWORK_CONFIG_PATH, ''),
-        'updater': (UPDATER_CONFIG_PATH, ''),
-    }
-    
-    if config_type in paths:
-        new_path, legacy_path = paths[config_type]
-        return legacy_path if use_legacy else new_path
+    paths = _REGISTRY.get(config_type) or _UNREGISTERED_PATHS.get(config_type)
+    if paths is not None:
+        return paths[1] if use_legacy else paths[0]
     
     raise ValueError(f"Unknown config type: {config_type}")
 
@@ -534,53 +703,84 @@ def needs_migration() -> bool:
     Returns:
         bool: True if legacy configs exist but new structure doesn't
     """
-    # If new config directory exists with content, no migration needed
-    if os.path.exists(CONFIG_DIR) and os.listdir(CONFIG_DIR):
-        return False
+    # If new config directory exists with content, no migration needed;
+    # stop at the first entry instead of listing the whole directory
+    try:
+        with os.scandir(CONFIG_DIR) as entries:
+            if next(entries, None) is not None:
+                return False
+    except FileNotFoundError:
+        pass
     
     # Check if any legacy configs exist
-    legacy_paths = [
-        LEGACY_STORAGE_PATH,
-        LEGACY_REPOSITORIES_PATH,
-        LEGACY_AUTH_PATH,
-        LEGACY_UPDATE_PATH,
-    ]
-    
-    return any(os.path.exists(p) for p in legacy_paths)
+    return any(os.path.exists(p) for p in _LEGACY_CONFIG_PATHS)
 
 
 # --- Convenience functions for getting specific values ---
 
+def _get_settings(name: str, cls):
+    """
+    Get the settings view of a configuration type.
+    
+    The view is rebuilt only when the underlying cached config changes.
+    
+    Args:
+        name: Configuration type, a key of _CONFIG_GETTERS
+        cls: Settings dataclass to build
+        
+    Returns:
+        An instance of cls
+    """
+    config = _CONFIG_GETTERS[name]()
+    cached = _settings_cache.get(name)
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    
+    settings = cls(**{f.name: config[f.name] for f in fields(cls)})
+    _settings_cache[name] = (config, settings)
+    return settings
+
+
+def get_storage_settings() -> StorageConfig:
+    """Get the storage configuration as an immutable StorageConfig."""
+    return _get_settings('storage', StorageConfig)
+
+
+def get_system_settings() -> SystemConfig:
+    """Get the system configuration as an immutable SystemConfig."""
+    return _get_settings('system', SystemConfig)
+
+
 def get_vm_storage_path() -> str:
     """Get the VM storage path."""
-    return get_storage_config()['vm_storage_path']
+    return get_storage_settings().vm_storage_path
 
 
 def get_iso_storage_path() -> str:
     """Get the ISO storage path."""
-    return get_storage_config()['iso_storage_path']
+    return get_storage_settings().iso_storage_path
 
 
 def get_default_pool_name() -> str:
     """Get the default storage pool name."""
-    return get_storage_config()['default_pool_name']
+    return get_storage_settings().default_pool_name
 
 
 def get_network_mode() -> str:
     """Get the network mode (bridge or nat)."""
-    return get_system_config()['network_mode']
+    return get_system_settings().network_mode
 
 
 def get_bridge_name() -> str:
     """Get the bridge name."""
-    return get_system_config()['bridge_name']
+    return get_system_settings().bridge_name
 
 
 def get_nat_network_name() -> str:
     """Get the NAT network name."""
-    return get_system_config()['nat_network_name']
+    return get_system_settings().nat_network_name
 
 
 def get_service_name() -> str:
     """Get the systemd service name."""
-    return get_system_config()['service_name']
+    return get_system_settings().service_name
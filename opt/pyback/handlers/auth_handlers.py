@@ -4,11 +4,16 @@ Authentication HTTP Handlers
 Handles HTTP requests for authentication, user management, and API key management.
 """
 
+import asyncio
+import functools
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 from aiohttp import web
 
-from pyback.auth.pam_auth import authenticate_user, user_exists, get_user_info
-from pyback.auth.jwt_auth import generate_token, verify_token, refresh_token
+from pyback.auth.pam_auth import authenticate_user_async, user_exists, get_user_info
+from pyback.auth.jwt_auth import generate_token, verify_token, refresh_from_claims
 from pyback.auth.api_keys import (
     create_api_key, list_user_api_keys, revoke_api_key, 
     delete_api_key, update_api_key
@@ -17,10 +22,90 @@ from pyback.auth.user_management import (
     create_user, delete_user, change_password, list_users,
     update_user_metadata, is_admin
 )
-from pyback.auth.middleware import get_current_user, get_username, require_admin
+from pyback.auth.middleware import (
+    get_bearer_token, get_current_user, get_username, is_current_user_admin,
+    require_admin
+)
+from pyback.utils.json_utils import json_encode, json_loads_as
+from pyback.utils.responses import error_response, json_response
 
 logger = logging.getLogger(__name__)
 
+# User management shells out to useradd/usermod/chpasswd and friends, so
+# those calls run on a small pool instead of blocking the event loop
+_USER_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='user-mgmt')
+
+
+async def _run_blocking(func, *args, **kwargs):
+    """Run a blocking user management call on the user management pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_USER_EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+_NOT_AUTHENTICATED_BODY = json_encode(
+    {'status': 'error', 'authenticated': False, 'message': 'Not authenticated'}
+)
+
+
+# --- Request Bodies ---
+# Missing fields take the defaults below; wrongly typed fields reject the body.
+
+@dataclass(frozen=True, slots=True)
+class LoginBody:
+    username: str = ''
+    password: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class NewUserBody:
+    username: str = ''
+    password: str = ''
+    role: str = 'user'
+    full_name: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class UserUpdateBody:
+    role: Optional[str] = None
+    full_name: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class PasswordChangeBody:
+    new_password: str = ''
+    current_password: str = ''
+
+
+@dataclass(frozen=True, slots=True)
+class NewApiKeyBody:
+    name: str = ''
+    description: str = ''
+    expires_at: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ApiKeyUpdateBody:
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+async def _read_body(request: web.Request, cls):
+    """
+    Read and validate a JSON request body.
+    
+    Args:
+        request: The aiohttp request object
+        cls: Request body dataclass to decode into
+        
+    Returns:
+        An instance of cls, or None if the body is malformed
+    """
+    try:
+        return json_loads_as(await request.read(), cls)
+    except ValueError as e:
+        logger.debug("Rejected %s body for %s: %s", cls.__name__, request.path, e)
+        return None
+
 
 # --- Authentication Endpoints ---
 
@@ -32,83 +117,57 @@ async def login(request: web.Request) -> web.Response:
     Body: {"username": "user", "password": "pass"}
     """
     try:
-        data = await request.json()
-        username = data.get('username', '').strip()
-        password = data.get('password', '')
+        body = await _read_body(request, LoginBody)
+        if body is None:
+            return error_response('Invalid request body', 400)
+        username = body.username.strip()
+        password = body.password
         
         if not username or not password:
-            return web.json_response(
-                {
-                    'status': 'error',
-                    'message': 'Username and password are required'
-                },
-                status=400
-            )
+            return error_response('Username and password are required', 400)
         
         # Authenticate with PAM
-        if not authenticate_user(username, password):
-            logger.warning(f"Failed login attempt for user: {username}")
-            return web.json_response(
-                {
-                    'status': 'error',
-                    'message': 'Invalid username or password'
-                },
-                status=401
-            )
+        if not await authenticate_user_async(username, password):
+            logger.warning("Failed login attempt for user: %s", username)
+            return error_response('Invalid username or password', 401)
         
         # Check if user is in starlight-users group or is admin
         from pyback.auth.pam_auth import is_user_in_group
         from pyback.auth.user_management import STARLIGHT_GROUP
         
-        if not is_user_in_group(username, STARLIGHT_GROUP) and not is_admin(username):
-            logger.warning(f"User {username} not authorized for Starlight access")
-            return web.json_response(
-                {
-                    'status': 'error',
-                    'message': 'User not authorized for Starlight access'
-                },
-                status=403
-            )
+        admin = is_admin(username)
+        if not admin and not is_user_in_group(username, STARLIGHT_GROUP):
+            logger.warning("User %s not authorized for Starlight access", username)
+            return error_response('User not authorized for Starlight access', 403)
         
         # Generate JWT token
-        token = generate_token(username, {'role': 'admin' if is_admin(username) else 'user'})
+        role = 'admin' if admin else 'user'
+        token = generate_token(username, {'role': role})
         
         if not token:
-            return web.json_response(
-                {
-                    'status': 'error',
-                    'message': 'Failed to generate authentication token'
-                },
-                status=500
-            )
+            return error_response('Failed to generate authentication token', 500)
         
-        logger.info(f"Successful login for user: {username}")
+        logger.info("Successful login for user: %s", username)
         
         # Get user info
         user_info = get_user_info(username)
         
-        return web.json_response(
+        return json_response(
             {
                 'status': 'success',
                 'message': 'Login successful',
                 'token': token,
                 'user': {
                     'username': username,
-                    'role': 'admin' if is_admin(username) else 'user',
+                    'role': role,
                     'uid': user_info.get('uid') if user_info else None
                 }
             }
         )
     
     except Exception as e:
-        logger.error(f"Error during login: {e}")
-        return web.json_response(
-            {
-                'status': 'error',
-                'message': 'An error occurred during login'
-            },
-            status=500
-        )
+        logger.error("Error during login: %s", e)
+        return error_response('An error occurred during login', 500)
 
 
 async def logout(request: web.Request) -> web.Response:
@@ -121,9 +180,9 @@ async def logout(request: web.Request) -> web.Response:
     # We just log the event
     user = get_current_user(request)
     if user:
-        logger.info(f"User logged out: {user['username']}")
+        logger.info("User logged out: %s", user['username'])
     
-    return web.json_response(
+    return json_response(
         {
             'status': 'success',
             'message': 'Logged out successfully'
@@ -140,23 +199,16 @@ async def verify(request: web.Request) -> web.Response:
     user = get_current_user(request)
     
     if not user:
-        return web.json_response(
-            {
-                'status': 'error',
-                'authenticated': False,
-                'message': 'Not authenticated'
-            },
-            status=401
-        )
+        return web.Response(body=_NOT_AUTHENTICATED_BODY, status=401, content_type='application/json')
     
-    return web.json_response(
+    return json_response(
         {
             'status': 'success',
             'authenticated': True,
             'user': {
                 'username': user['username'],
                 'auth_type': user['auth_type'],
-                'role': 'admin' if is_admin(user['username']) else 'user'
+                'role': 'admin' if is_current_user_admin(request) else 'user'
             }
         }
     )
@@ -171,38 +223,19 @@ async def refresh(request: web.Request) -> web.Response:
     user = get_current_user(request)
     
     if not user or user['auth_type'] != 'jwt':
-        return web.json_response(
-            {
-                'status': 'error',
-                'message': 'Invalid token for refresh'
-            },
-            status=401
-        )
+        return error_response('Invalid token for refresh', 401)
     
-    # Extract old token
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return web.json_response(
-            {
-                'status': 'error',
-                'message': 'Invalid authorization header'
-            },
-            status=400
-        )
+    # Only tokens sent as Authorization: Bearer can be refreshed
+    if not get_bearer_token(request):
+        return error_response('Invalid authorization header', 400)
     
-    old_token = auth_header[7:]
-    new_token = refresh_token(old_token)
+    # The middleware already verified the token, so reuse its claims
+    new_token = refresh_from_claims(user['token_payload'])
     
     if not new_token:
-        return web.json_response(
-            {
-                'status': 'error',
-                'message': 'Failed to refresh token'
-            },
-            status=500
-        )
+        return error_response('Failed to refresh token', 500)
     
-    return web.json_response(
+    return json_response(
         {
             'status': 'success',
             'token': new_token
@@ -220,23 +253,17 @@ async def get_users(request: web.Request) -> web.Response:
     GET /api/users
     """
     try:
-        users = list_users(include_system=False)
+        users = await _run_blocking(list_users, include_system=False)
         
-        return web.json_response(
+        return json_response(
             {
                 'status': 'success',
                 'users': users
             }
         )
     except Exception as e:
-        logger.error(f"Error listing users: {e}")
-        return web.json_response(
-            {
-                'status': 'error',
-                'message': 'Failed to list users'
-            },
-            status=500
-        )
+        logger.error("Error listing users: %s", e)
+        return error_response('Failed to list users', 500)
 
 
 @require_admin
@@ -248,23 +275,20 @@ async def add_user(request: web.Request) -> web.Response:
     Body: {"username": "user", "password": "pass", "role": "user", "full_name": "Full Name"}
     """
     try:
-        data = await request.json()
-        username = data.get('username', '').strip()
-        password = data.get('password', '')
-        role = data.get('role', 'user')
-        full_name = data.get('full_name', '')
+        body = await _read_body(request, NewUserBody)
+        if body is None:
+            return error_response('Invalid request body', 400)
+        username = body.username.strip()
+        password = body.password
+        role = body.role
+        full_name = body.full_name
         
         if not username or not password:
-            return web.json_response(
-                {
-                    'status': 'error',
-                    'message': 'Username and password are required'
-                },
-                status=400
-            )
+            return error_response('Username and password are required', 400)
         
+        # Cached lookup; a stale miss is caught by create_user below
         if user_exists(username):
-            return web.json_response(
+            return json_response(
                 {
                     'status': 'error',
                     'message': f'User {username} already exists'
@@ -272,22 +296,18 @@ async def add_user(request: web.Request) -> web.Response:
                 status=409
             )
         
-        result = create_user(username, password, role, full_name)
+        result = await _run_blocking(create_user, username, password, role, full_name)
         
         if result['status'] == 'success':
-            return web.json_response(result, status=201)
+            return json_response(result, status=201)
+        elif result.get('exists'):
+            return json_response(result, status=409)
         else:
-            return web.json_response(result, status=400)
+            return json_response(result, status=400)
     
     except Exception as e:
-        logger.error(f"Error creating user: {e}")
-        return web.json_response(
-            {
-                'status': 'error',
-                'message': 'Failed to create user'
-            },
-            status=500
-        )
+        logger.error("Error creating user: %s", e)
+        return error_response('Failed to create user', 500)
 
 
 async def modify_user(request: web.Request) -> web.Response:
@@ -302,42 +322,33 @@ async def modify_user(request: web.Request) -> web.Response:
         current_user = get_current_user(request)
         
         if not current_user:
-            return web.json_response(
-                {'status': 'error', 'message': 'Authentication required'},
-                status=401
-            )
+            return error_response('Authentication required', 401)
         
         # Check permissions (admin or self)
-        if target_username != current_user['username'] and not is_admin(current_user['username']):
-            return web.json_response(
-                {'status': 'error', 'message': 'Permission denied'},
-                status=403
-            )
+        is_user_admin = is_current_user_admin(request)
+        if target_username != current_user['username'] and not is_user_admin:
+            return error_response('Permission denied', 403)
         
-        data = await request.json()
-        role = data.get('role')
-        full_name = data.get('full_name')
+        body = await _read_body(request, UserUpdateBody)
+        if body is None:
+            return error_response('Invalid request body', 400)
+        role = body.role
+        full_name = body.full_name
         
         # Only admin can change roles
-        if role and not is_admin(current_user['username']):
-            return web.json_response(
-                {'status': 'error', 'message': 'Only admins can change user roles'},
-                status=403
-            )
+        if role and not is_user_admin:
+            return error_response('Only admins can change user roles', 403)
         
-        result = update_user_metadata(target_username, role, full_name)
+        result = await _run_blocking(update_user_metadata, target_username, role, full_name)
         
         if result['status'] == 'success':
-            return web.json_response(result)
+            return json_response(result)
         else:
-            return web.json_response(result, status=400)
+            return json_response(result, status=400)
     
     except Exception as e:
-        logger.error(f"Error updating user: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to update user'},
-            status=500
-        )
+        logger.error("Error updating user: %s", e)
+        return error_response('Failed to update user', 500)
 
 
 @require_admin
@@ -351,24 +362,21 @@ async def remove_user(request: web.Request) -> web.Response:
         username = request.match_info['username']
         
         if not user_exists(username):
-            return web.json_response(
+            return json_response(
                 {'status': 'error', 'message': f'User {username} does not exist'},
                 status=404
             )
         
-        result = delete_user(username, remove_home=True)
+        result = await _run_blocking(delete_user, username, remove_home=True)
         
         if result['status'] == 'success':
-            return web.json_response(result)
+            return json_response(result)
         else:
-            return web.json_response(result, status=400)
+            return json_response(result, status=400)
     
     except Exception as e:
-        logger.error(f"Error deleting user: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to delete user'},
-            status=500
-        )
+        logger.error("Error deleting user: %s", e)
+        return error_response('Failed to delete user', 500)
 
 
 async def change_user_password(request: web.Request) -> web.Response:
@@ -383,57 +391,41 @@ async def change_user_password(request: web.Request) -> web.Response:
         current_user = get_current_user(request)
         
         if not current_user:
-            return web.json_response(
-                {'status': 'error', 'message': 'Authentication required'},
-                status=401
-            )
+            return error_response('Authentication required', 401)
         
-        data = await request.json()
-        new_password = data.get('new_password', '')
-        current_password = data.get('current_password', '')
+        body = await _read_body(request, PasswordChangeBody)
+        if body is None:
+            return error_response('Invalid request body', 400)
+        new_password = body.new_password
+        current_password = body.current_password
         
         if not new_password:
-            return web.json_response(
-                {'status': 'error', 'message': 'New password is required'},
-                status=400
-            )
+            return error_response('New password is required', 400)
         
         # Check permissions
         is_self = target_username == current_user['username']
-        is_user_admin = is_admin(current_user['username'])
+        is_user_admin = is_current_user_admin(request)
         
         if not is_self and not is_user_admin:
-            return web.json_response(
-                {'status': 'error', 'message': 'Permission denied'},
-                status=403
-            )
+            return error_response('Permission denied', 403)
         
         # If changing own password, verify current password
         if is_self and not is_user_admin:
             if not current_password:
-                return web.json_response(
-                    {'status': 'error', 'message': 'Current password is required'},
-                    status=400
-                )
-            if not authenticate_user(target_username, current_password):
-                return web.json_response(
-                    {'status': 'error', 'message': 'Current password is incorrect'},
-                    status=401
-                )
-        
-        result = change_password(target_username, new_password)
+                return error_response('Current password is required', 400)
+            if not await authenticate_user_async(target_username, current_password):
+                return error_response('Current password is incorrect', 401)
+        
+        result = await _run_blocking(change_password, target_username, new_password)
         
         if result['status'] == 'success':
-            return web.json_response(result)
+            return json_response(result)
         else:
-            return web.json_response(result, status=400)
+            return json_response(result, status=400)
     
     except Exception as e:
-        logger.error(f"Error changing password: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to change password'},
-            status=500
-        )
+        logger.error("Error changing password: %s", e)
+        return error_response('Failed to change password', 500)
 
 
 # --- API Key Management Endpoints ---
@@ -447,25 +439,19 @@ async def get_api_keys(request: web.Request) -> web.Response:
     try:
         username = get_username(request)
         if not username:
-            return web.json_response(
-                {'status': 'error', 'message': 'Authentication required'},
-                status=401
-            )
+            return error_response('Authentication required', 401)
         
         keys = list_user_api_keys(username)
         
-        return web.json_response(
+        return json_response(
             {
                 'status': 'success',
                 'api_keys': keys
             }
         )
     except Exception as e:
-        logger.error(f"Error listing API keys: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to list API keys'},
-            status=500
-        )
+        logger.error("Error listing API keys: %s", e)
+        return error_response('Failed to list API keys', 500)
 
 
 async def create_new_api_key(request: web.Request) -> web.Response:
@@ -478,31 +464,27 @@ async def create_new_api_key(request: web.Request) -> web.Response:
     try:
         username = get_username(request)
         if not username:
-            return web.json_response(
-                {'status': 'error', 'message': 'Authentication required'},
-                status=401
-            )
+            return error_response('Authentication required', 401)
         
-        data = await request.json()
-        name = data.get('name', '').strip()
-        description = data.get('description', '')
-        expires_at = data.get('expires_at')
+        body = await _read_body(request, NewApiKeyBody)
+        if body is None:
+            return error_response('Invalid request body', 400)
+        name = body.name.strip()
+        description = body.description
+        expires_at = body.expires_at
         
         if not name:
-            return web.json_response(
-                {'status': 'error', 'message': 'API key name is required'},
-                status=400
-            )
+            return error_response('API key name is required', 400)
         
         try:
             key_info = create_api_key(username, name, description, expires_at)
         except RuntimeError as e:
-            return web.json_response(
+            return json_response(
                 {'status': 'error', 'message': str(e)},
                 status=503  # Service Unavailable
             )
         
-        return web.json_response(
+        return json_response(
             {
                 'status': 'success',
                 'message': 'API key created successfully. Save it now - it won\'t be shown again!',
@@ -511,11 +493,8 @@ async def create_new_api_key(request: web.Request) -> web.Response:
             status=201
         )
     except Exception as e:
-        logger.error(f"Error creating API key: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to create API key'},
-            status=500
-        )
+        logger.error("Error creating API key: %s", e)
+        return error_response('Failed to create API key', 500)
 
 
 async def delete_user_api_key(request: web.Request) -> web.Response:
@@ -527,30 +506,21 @@ async def delete_user_api_key(request: web.Request) -> web.Response:
     try:
         username = get_username(request)
         if not username:
-            return web.json_response(
-                {'status': 'error', 'message': 'Authentication required'},
-                status=401
-            )
+            return error_response('Authentication required', 401)
         
         key_id = request.match_info['key_id']
         
         success = delete_api_key(key_id, username)
         
         if success:
-            return web.json_response(
+            return json_response(
                 {'status': 'success', 'message': 'API key deleted successfully'}
             )
         else:
-            return web.json_response(
-                {'status': 'error', 'message': 'Failed to delete API key or key not found'},
-                status=404
-            )
+            return error_response('Failed to delete API key or key not found', 404)
     except Exception as e:
-        logger.error(f"Error deleting API key: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to delete API key'},
-            status=500
-        )
+        logger.error("Error deleting API key: %s", e)
+        return error_response('Failed to delete API key', 500)
 
 
 async def modify_api_key(request: web.Request) -> web.Response:
@@ -563,30 +533,23 @@ async def modify_api_key(request: web.Request) -> web.Response:
     try:
         username = get_username(request)
         if not username:
-            return web.json_response(
-                {'status': 'error', 'message': 'Authentication required'},
-                status=401
-            )
+            return error_response('Authentication required', 401)
         
         key_id = request.match_info['key_id']
-        data = await request.json()
-        name = data.get('name')
-        description = data.get('description')
+        body = await _read_body(request, ApiKeyUpdateBody)
+        if body is None:
+            return error_response('Invalid request body', 400)
+        name = body.name
+        description = body.description
         
         success = update_api_key(key_id, username, name, description)
         
         if success:
-            return web.json_response(
+            return json_response(
                 {'status': 'success', 'message': 'API key updated successfully'}
             )
         else:
-            return web.json_response(
-                {'status': 'error', 'message': 'Failed to update API key or key not found'},
-                status=404
-            )
+            return error_response('Failed to update API key or key not found', 404)
     except Exception as e:
-        logger.error(f"Error updating API key: {e}")
-        return web.json_response(
-            {'status': 'error', 'message': 'Failed to update API key'},
-            status=500
-        )
+        logger.error("Error updating API key: %s", e)
+        return error_response('Failed to update API key', 500)
@@ -6,15 +6,17 @@ and managing orphaned containers.
 """
 
 import os
-import shutil
+import asyncio
+import heapq
 import logging
 import libvirt
 import time
-from aiohttp import web
 
 from ..config_loader import get_vm_storage_path
 from ..utils.libvirt_connection import get_connection
-from ..models.lxc import get_lxc_metadata
+from ..models.lxc import load_lxc_metadata
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -24,45 +26,88 @@ download_progress = {}
 # Timeout in seconds for auto-removing completed/error entries
 CLEANUP_TIMEOUT = 30
 
+# Statuses whose entries are auto-removed; 'complete' is kept for backward compatibility
+TERMINAL_STATUSES = frozenset(('error', 'completed', 'complete'))
+
+# Orphaned rootfs trees deleted at the same time, to avoid thrashing the disk
+ROOTFS_DELETE_CONCURRENCY = 4
+
+# Finished entries kept at most; beyond this the oldest are removed early
+MAX_FINISHED_DOWNLOADS = 1024
+
+# (expiry time, vm_name) for entries that reached a terminal status. Entries
+# are checked again when popped, since they may have been updated or dismissed.
+_expiry_heap = []
+
+# Names with an entry in _expiry_heap, so each download is scheduled once
+_scheduled = set()
+
+
+def _expire_finished_downloads(current_time):
+    """Removes finished entries whose cleanup time has passed.
+    
+    Also trims the oldest finished entries while more than
+    MAX_FINISHED_DOWNLOADS are scheduled, so the dict stays bounded even if
+    nobody polls the downloads list.
+    
+    Args:
+        current_time: current time.time() value
+    """
+    while _expiry_heap and (_expiry_heap[0][0] <= current_time or len(_expiry_heap) > MAX_FINISHED_DOWNLOADS):
+        expires_at, vm_name = heapq.heappop(_expiry_heap)
+        _scheduled.discard(vm_name)
+        data = download_progress.get(vm_name)
+        if data is None or data.get('status', 'downloading') not in TERMINAL_STATUSES:
+            continue
+        
+        # Updated since it was scheduled; check again later
+        age = current_time - data.get('timestamp', current_time)
+        if age < CLEANUP_TIMEOUT and expires_at <= current_time:
+            heapq.heappush(_expiry_heap, (current_time - age + CLEANUP_TIMEOUT, vm_name))
+            _scheduled.add(vm_name)
+            continue
+        
+        logger.info("Auto-removing download entry for %s (status: %s, age: %.1fs)", vm_name, data.get('status'), age)
+        del download_progress[vm_name]
+
+
+def schedule_download_cleanup(vm_name, timestamp):
+    """Schedules a finished download entry for removal after CLEANUP_TIMEOUT.
+    
+    Args:
+        vm_name: key of the entry in download_progress
+        timestamp: time the entry reached its terminal status
+    """
+    # An entry already in the heap is pushed back by its own timestamp when
+    # it comes due, so a second heap entry would only use up a slot
+    if vm_name not in _scheduled:
+        heapq.heappush(_expiry_heap, (timestamp + CLEANUP_TIMEOUT, vm_name))
+        _scheduled.add(vm_name)
+    _expire_finished_downloads(time.time())
+
 
 async def get_download_progress(request):
     """Returns the current download progress for a VM."""
     vm_name = request.match_info.get('vm_name')
     
     if vm_name in download_progress:
-        return web.json_response({'status': 'success', 'progress': download_progress[vm_name]})
+        return json_response({'status': 'success', 'progress': download_progress[vm_name]})
     else:
-        return web.json_response({'status': 'error', 'message': 'No download in progress for this VM'}, status=404)
+        return json_response({'status': 'error', 'message': 'No download in progress for this VM'}, status=404)
 
 
 async def get_all_downloads(request):
     """Returns all current download progresses and cleans up stale entries."""
-    current_time = time.time()
+    _expire_finished_downloads(time.time())
     
-    # Clean up entries that are in error or completed state and older than CLEANUP_TIMEOUT
-    entries_to_remove = []
-    for vm_name, data in download_progress.items():
-        status = data.get('status', 'downloading')
-        timestamp = data.get('timestamp', current_time)
-        
-        # Remove if status is error or completed and timeout has elapsed
-        # Note: Check both 'completed' and 'complete' for backward compatibility
-        if status in ['error', 'completed', 'complete'] and (current_time - timestamp) >= CLEANUP_TIMEOUT:
-            entries_to_remove.append(vm_name)
-    
-    # Remove stale entries
-    for vm_name in entries_to_remove:
-        logger.info(f"Auto-removing download entry for {vm_name} (status: {download_progress[vm_name].get('status')}, age: {current_time - download_progress[vm_name].get('timestamp', current_time):.1f}s)")
-        del download_progress[vm_name]
-    
-    return web.json_response({'status': 'success', 'downloads': download_progress})
+    return json_response({'status': 'success', 'downloads': download_progress})
 
 
 async def get_deployment_logs(request):
     """Returns recent deployment logs for debugging."""
     # Return last 100 lines of logs (stored in memory)
     # For now, just return download progress and any stored errors
-    return web.json_response({
+    return json_response({
         'status': 'success', 
         'downloads': download_progress,
         'message': 'Check server console for detailed logs'
@@ -75,78 +120,136 @@ async def dismiss_download(request):
     
     if vm_name in download_progress:
         del download_progress[vm_name]
-        logger.info(f"Manually dismissed download entry for {vm_name}")
-        return web.json_response({'status': 'success', 'message': f'Download entry for {vm_name} dismissed'})
+        logger.info("Manually dismissed download entry for %s", vm_name)
+        return json_response({'status': 'success', 'message': f'Download entry for {vm_name} dismissed'})
     else:
-        return web.json_response({'status': 'error', 'message': 'Download entry not found'}, status=404)
+        return json_response({'status': 'error', 'message': 'Download entry not found'}, status=404)
+
+
+def _scan_orphaned_containers(action, container_name):
+    """Finds orphaned LXC containers and removes them when action is 'cleanup'.
+    
+    Runs blocking libvirt calls, so it is meant to run in an executor.
+    
+    Args:
+        action: 'list' or 'cleanup'
+        container_name: only clean up this container, or None for all
+        
+    Returns:
+        tuple: (orphaned container descriptions, rootfs paths left to delete)
+    """
+    orphaned = []
+    rootfs_paths = []
+    
+    # Check LXC connection for containers
+    lxc_conn = get_connection('lxc')
+    if not lxc_conn:
+        return orphaned, rootfs_paths
+    
+    try:
+        containers = lxc_conn.listAllDomains(libvirt.VIR_CONNECT_LIST_DOMAINS_ACTIVE | libvirt.VIR_CONNECT_LIST_DOMAINS_INACTIVE)
+        # Read the metadata file once for all containers
+        all_metadata = load_lxc_metadata()
+        
+        for container in containers:
+            name = container.name()
+            
+            # Check if this container has metadata (properly installed)
+            lxc_metadata = all_metadata.get(name)
+            if lxc_metadata and 'type' in lxc_metadata:
+                continue
+            
+            # This is an orphaned container
+            active = container.isActive()
+            orphaned.append({
+                'name': name,
+                'state': active,
+                'id': container.ID() if active else None
+            })
+            
+            # If cleanup action and matches the name (or no specific name given)
+            if action == 'cleanup' and (not container_name or container_name == name):
+                try:
+                    # Stop if running
+                    if active:
+                        container.destroy()
+                        logger.info("Stopped orphaned container %s", name)
+                    
+                    # Undefine
+                    container.undefine()
+                    logger.info("Undefined orphaned container %s", name)
+                    
+                    # Rootfs trees are deleted afterwards, in parallel
+                    storage_path = get_vm_storage_path()
+                    rootfs_path = f"{storage_path}/{name}-rootfs"
+                    if os.path.exists(rootfs_path):
+                        rootfs_paths.append(rootfs_path)
+                except Exception as e:
+                    logger.error("Failed to cleanup %s: %s", name, e)
+    except Exception as e:
+        logger.error("Error checking LXC containers: %s", e)
+    
+    return orphaned, rootfs_paths
+
+
+async def _delete_rootfs(rootfs_path, semaphore):
+    """Deletes an orphaned container's rootfs tree with rm -rf.
+    
+    rm walks large trees much faster than shutil.rmtree and runs as a
+    separate process, so the event loop is never blocked.
+    
+    Args:
+        rootfs_path: rootfs directory to delete, inside the VM storage path
+        semaphore: limits how many trees are deleted at once
+    """
+    # Only ever delete direct children of the storage directory
+    storage_path = os.path.realpath(get_vm_storage_path())
+    if os.path.dirname(os.path.realpath(rootfs_path)) != storage_path:
+        logger.error("Refusing to delete %s: not inside %s", rootfs_path, storage_path)
+        return
+    
+    async with semaphore:
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                'rm', '-rf', '--one-file-system', '--', rootfs_path,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await proc.communicate()
+            if proc.returncode == 0:
+                logger.info("Deleted orphaned rootfs at %s", rootfs_path)
+            else:
+                logger.error("Failed to delete rootfs %s: %s", rootfs_path, stderr.decode(errors='replace').strip())
+        except Exception as e:
+            logger.error("Failed to delete rootfs %s: %s", rootfs_path, e)
 
 
 async def cleanup_orphaned_containers(request):
     """Finds and optionally removes orphaned LXC containers that failed during installation."""
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except:
         data = {}
     
     action = data.get('action', 'list')  # 'list' or 'cleanup'
     container_name = data.get('name')  # Optional: specific container to cleanup
     
-    orphaned = []
+    # libvirt calls block, so scan off the event loop
+    loop = asyncio.get_running_loop()
+    orphaned, rootfs_paths = await loop.run_in_executor(None, _scan_orphaned_containers, action, container_name)
     
-    # Check LXC connection for containers
-    lxc_conn = get_connection('lxc')
-    if lxc_conn:
-        try:
-            containers = lxc_conn.listAllDomains(libvirt.VIR_CONNECT_LIST_DOMAINS_ACTIVE | libvirt.VIR_CONNECT_LIST_DOMAINS_INACTIVE)
-            
-            for container in containers:
-                name = container.name()
-                
-                # Check if this container has metadata (properly installed)
-                lxc_metadata = get_lxc_metadata(name)
-                if not lxc_metadata or 'type' not in lxc_metadata:
-                    # This is an orphaned container
-                    orphaned.append({
-                        'name': name,
-                        'state': container.isActive(),
-                        'id': container.ID() if container.isActive() else None
-                    })
-                    
-                    # If cleanup action and matches the name (or no specific name given)
-                    if action == 'cleanup' and (not container_name or container_name == name):
-                        try:
-                            # Stop if running
-                            if container.isActive():
-                                container.destroy()
-                                logger.info(f"Stopped orphaned container {name}")
-                            
-                            # Undefine
-                            container.undefine()
-                            logger.info(f"Undefined orphaned container {name}")
-                            
-                            # Try to delete rootfs
-                            storage_path = get_vm_storage_path()
-                            rootfs_path = f"{storage_path}/{name}-rootfs"
-                            if os.path.exists(rootfs_path):
-                                shutil.rmtree(rootfs_path)
-                                logger.info(f"Deleted orphaned rootfs at {rootfs_path}")
-                        except Exception as e:
-                            logger.error(f"Failed to cleanup {name}: {e}")
-            
-            lxc_conn.close()
-        except Exception as e:
-            logger.error(f"Error checking LXC containers: {e}")
-            if lxc_conn:
-                lxc_conn.close()
+    if rootfs_paths:
+        semaphore = asyncio.Semaphore(ROOTFS_DELETE_CONCURRENCY)
+        await asyncio.gather(*(_delete_rootfs(path, semaphore) for path in rootfs_paths))
     
     if action == 'cleanup':
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'message': f'Cleaned up {len(orphaned)} orphaned container(s)',
             'cleaned': orphaned
         })
     else:
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'orphaned_containers': orphaned
         })
@@ -6,15 +6,19 @@ These endpoints are only accessible when the .needs-firstrun flag exists.
 """
 
 import os
+import re
+import asyncio
 import logging
+import shutil
 import subprocess
 import socket
+import time
 import json
 import libvirt
 from aiohttp import web
 
 from pyback.auth.user_management import create_user, change_password
-from pyback.auth.pam_auth import user_exists
+from pyback.auth.pam_auth import clear_user_cache
 from pyback.config_loader import (
     CONFIG_BASE_DIR,
     STORAGE_CONFIG_PATH,
@@ -23,6 +27,8 @@ from pyback.config_loader import (
     ensure_config_directories,
 )
 from pyback.storage.pool import ensure_storage_pool
+from pyback.utils.json_utils import json_loads
+from pyback.utils.responses import error_response, json_response, success_response
 
 logger = logging.getLogger(__name__)
 
@@ -32,20 +38,98 @@ FIRSTRUN_FLAG = os.path.join(STARLIGHT_CONFIG_DIR, '.needs-firstrun')
 FIRSTRUN_COMPLETE_FLAG = os.path.join(STARLIGHT_CONFIG_DIR, '.firstrun-complete')
 STORAGE_CONFIG_FILE = STORAGE_CONFIG_PATH
 
+# Wizard request bodies are a few short fields; anything bigger is rejected
+# before it is read or parsed
+MAX_BODY_SIZE = 4096
+
+# Regex patterns for validation
+USERNAME_PATTERN = re.compile(r'^[a-z_][a-z0-9_-]*$')
+HOSTNAME_PATTERN = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9-]*[a-zA-Z0-9])?$')
+
+# Set once the complete flag has been seen. The wizard never becomes
+# needed again after that, so the flags aren't checked anymore.
+_firstrun_completed = False
+
 
 def needs_firstrun() -> bool:
     """Check if first-run wizard is still needed."""
-    return os.path.exists(FIRSTRUN_FLAG) and not os.path.exists(FIRSTRUN_COMPLETE_FLAG)
+    global _firstrun_completed
+    if _firstrun_completed:
+        return False
+    # The flags are plain files; lstat() is enough and never follows a link
+    if os.path.lexists(FIRSTRUN_COMPLETE_FLAG):
+        _firstrun_completed = True
+        return False
+    return os.path.lexists(FIRSTRUN_FLAG)
+
+
+async def _run_command(*args, input=None, timeout=None):
+    """
+    Run a command without blocking the event loop.
+    
+    Args:
+        *args: Program and arguments
+        input: Optional text to write to the command's stdin
+        timeout: Optional timeout in seconds; the command is killed when it expires
+        
+    Returns:
+        tuple: (returncode, stdout, stderr) with the output decoded as text
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            proc.communicate(input.encode() if input is not None else None),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stdout.decode(errors='replace'), stderr.decode(errors='replace')
+
+
+async def _read_small_json(request: web.Request):
+    """
+    Read and parse a JSON object body of at most MAX_BODY_SIZE bytes.
+    
+    Args:
+        request: The aiohttp request object
+        
+    Returns:
+        dict: The parsed body, or None if it is too large, invalid or not an object
+    """
+    # Read at most one byte past the limit, also for chunked bodies without
+    # a Content-Length
+    chunks = []
+    size = 0
+    while size <= MAX_BODY_SIZE:
+        chunk = await request.content.read(MAX_BODY_SIZE + 1 - size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if size > MAX_BODY_SIZE:
+        return None
+    
+    try:
+        data = json_loads(b''.join(chunks))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
 
 
 def require_firstrun(handler):
     """Decorator to ensure endpoint is only accessible during first-run."""
     async def wrapper(request: web.Request) -> web.Response:
         if not needs_firstrun():
-            return web.json_response(
-                {'status': 'error', 'message': 'First-run wizard already completed'},
-                status=403
-            )
+            return error_response('First-run wizard already completed', 403)
+        if request.content_length is not None and request.content_length > MAX_BODY_SIZE:
+            return error_response('Request body too large', 413)
         return await handler(request)
     return wrapper
 
@@ -56,10 +140,122 @@ async def firstrun_status(request: web.Request) -> web.Response:
     
     GET /api/firstrun/status
     """
-    return web.json_response({
-        'status': 'success',
-        'needs_firstrun': needs_firstrun()
-    })
+    return success_response(needs_firstrun=needs_firstrun())
+
+
+# Free space barely changes between wizard page loads, so disk usage is
+# reused for a few seconds
+DISK_USAGE_CACHE_TTL = 5.0
+_disk_usage_cache = {'ts': 0.0, 'value': None}
+
+
+def _cached_disk_usage():
+    """
+    Get disk usage for the VM image directory, or / if it doesn't exist yet.
+    
+    Returns:
+        namedtuple: (total, used, free) in bytes, cached for up to
+            DISK_USAGE_CACHE_TTL seconds
+    """
+    now = time.monotonic()
+    if _disk_usage_cache['value'] is None or now - _disk_usage_cache['ts'] > DISK_USAGE_CACHE_TTL:
+        try:
+            value = shutil.disk_usage('/var/lib/libvirt/images')
+        except FileNotFoundError:
+            value = shutil.disk_usage('/')
+        _disk_usage_cache['value'] = value
+        _disk_usage_cache['ts'] = now
+    return _disk_usage_cache['value']
+
+
+def _invalidate_disk_usage_cache():
+    """Drop the cached disk usage so the next request measures again."""
+    _disk_usage_cache['value'] = None
+
+
+# (ip_address, interface) from the first successful detection. The address
+# rarely changes while the wizard runs.
+_net_info_cache = None
+
+
+def _detect_network(refresh: bool = False):
+    """
+    Detect the primary IPv4 address and, when available, its interface.
+    
+    Args:
+        refresh: Detect again instead of using the cached result
+        
+    Returns:
+        tuple: (ip_address, interface); either may be None
+    """
+    global _net_info_cache
+    if _net_info_cache is not None and not refresh:
+        return _net_info_cache
+    
+    ip_address = None
+    interface = None
+    try:
+        # Try to get the IP address that would be used to reach the internet
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.settimeout(1.0)
+            s.connect(('8.8.8.8', 80))
+            ip_address = s.getsockname()[0]
+    except Exception:
+        # Fallback: get any non-localhost IP
+        try:
+            result = subprocess.run(
+                ['ip', '-4', 'route', 'get', '1'],
+                capture_output=True, text=True, timeout=5
+            )
+            if result.returncode == 0:
+                parts = result.stdout.split()
+                if 'src' in parts:
+                    ip_address = parts[parts.index('src') + 1]
+                if 'dev' in parts:
+                    interface = parts[parts.index('dev') + 1]
+        except Exception:
+            pass
+    
+    if ip_address:
+        _net_info_cache = (ip_address, interface)
+    return ip_address, interface
+
+
+def _collect_system_info(refresh: bool = False) -> dict:
+    """
+    Collect hostname, primary address and free disk space for the wizard.
+    
+    Blocking; runs in an executor.
+    
+    Args:
+        refresh: Detect the network address again instead of using the cache
+        
+    Returns:
+        dict: hostname, ip_address, interface, available_space and total_space
+    """
+    # Get hostname
+    hostname = socket.gethostname()
+    
+    # Get primary IP address
+    ip_address, interface = _detect_network(refresh)
+    
+    # Get available and total disk space
+    available_space = 'Unknown'
+    total_space = 'Unknown'
+    try:
+        usage = _cached_disk_usage()
+        available_space = f'{usage.free / (1024 ** 3):.1f} GB'
+        total_space = f'{usage.total / (1024 ** 3):.1f} GB'
+    except Exception:
+        pass
+    
+    return {
+        'hostname': hostname,
+        'ip_address': ip_address or 'Unknown',
+        'interface': interface or 'Unknown',
+        'available_space': available_space,
+        'total_space': total_space
+    }
 
 
 @require_firstrun
@@ -68,66 +264,20 @@ async def get_system_info(request: web.Request) -> web.Response:
     Get system information for the wizard.
     
     GET /api/firstrun/system-info
+    Query: refresh=1 to detect the network address again
     """
     try:
-        # Get hostname
-        hostname = socket.gethostname()
+        refresh = request.query.get('refresh') == '1'
         
-        # Get primary IP address
-        ip_address = None
-        interface = None
-        try:
-            # Try to get the IP address that would be used to reach the internet
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(('8.8.8.8', 80))
-            ip_address = s.getsockname()[0]
-            s.close()
-        except Exception:
-            # Fallback: get any non-localhost IP
-            try:
-                result = subprocess.run(
-                    ['ip', '-4', 'route', 'get', '1'],
-                    capture_output=True, text=True, timeout=5
-                )
-                if result.returncode == 0:
-                    parts = result.stdout.split()
-                    if 'src' in parts:
-                        ip_address = parts[parts.index('src') + 1]
-                    if 'dev' in parts:
-                        interface = parts[parts.index('dev') + 1]
-            except Exception:
-                pass
-        
-        # Get available disk space
-        available_space = 'Unknown'
-        try:
-            statvfs = os.statvfs('/var/lib/libvirt/images')
-            available_bytes = statvfs.f_frsize * statvfs.f_bavail
-            available_gb = available_bytes / (1024 ** 3)
-            available_space = f'{available_gb:.1f} GB'
-        except Exception:
-            try:
-                statvfs = os.statvfs('/')
-                available_bytes = statvfs.f_frsize * statvfs.f_bavail
-                available_gb = available_bytes / (1024 ** 3)
-                available_space = f'{available_gb:.1f} GB'
-            except Exception:
-                pass
+        # Socket, subprocess and statvfs calls block, so collect off the event loop
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(None, _collect_system_info, refresh)
         
-        return web.json_response({
-            'status': 'success',
-            'hostname': hostname,
-            'ip_address': ip_address or 'Unknown',
-            'interface': interface or 'Unknown',
-            'available_space': available_space
-        })
+        return success_response(**info)
     
     except Exception as e:
         logger.error(f"Error getting system info: {e}")
-        return web.json_response({
-            'status': 'error',
-            'message': 'Failed to get system information'
-        }, status=500)
+        return error_response('Failed to get system information')
 
 
 @require_firstrun
@@ -139,57 +289,88 @@ async def set_root_password(request: web.Request) -> web.Response:
     Body: {"password": "new_password"}
     """
     try:
-        data = await request.json()
+        data = await _read_small_json(request)
+        if data is None:
+            return error_response('Invalid request body', 400)
         password = data.get('password', '')
         
         if not password:
-            return web.json_response({
-                'status': 'error',
-                'message': 'Password is required'
-            }, status=400)
+            return error_response('Password is required', 400)
         
         if len(password) < 8:
-            return web.json_response({
-                'status': 'error',
-                'message': 'Password must be at least 8 characters'
-            }, status=400)
+            return error_response('Password must be at least 8 characters', 400)
         
         # Change root password using chpasswd
         # Password is passed via stdin to avoid exposure in process lists or logs
         try:
-            result = subprocess.run(
-                ['/usr/sbin/chpasswd'],
-                input=f'root:{password}\n',
-                capture_output=True,
-                text=True,
-                check=False
+            returncode, _, stderr = await _run_command(
+                '/usr/sbin/chpasswd',
+                input=f'root:{password}\n'
             )
             
-            if result.returncode != 0:
-                logger.error(f"chpasswd failed: {result.stderr}")
+            if returncode != 0:
+                logger.error(f"chpasswd failed: {stderr}")
                 raise Exception('chpasswd failed')
             
             # Log success without exposing the password
             logger.info("Root password changed successfully via first-run wizard")
             
-            return web.json_response({
-                'status': 'success',
-                'message': 'Root password changed successfully'
-            })
+            return success_response(message='Root password changed successfully')
         
         except Exception as e:
             logger.error(f"Failed to change root password: {e}")
-            return web.json_response({
-                'status': 'error',
-                'message': 'Failed to change root password'
-            }, status=500)
+            return error_response('Failed to change root password')
     
     except Exception as e:
         logger.error(f"Error in set_root_password: {e}")
-        return web.json_response({
-            'status': 'error',
-            'message': 'An error occurred'
-        }, status=500)
+        return error_response('An error occurred')
+
+
+def _ensure_admin_user(username: str, password: str):
+    """
+    Create the admin user, or update the password of an existing user and
+    add it to the starlight-users group. Blocking.
+    
+    Args:
+        username: Validated username
+        password: Validated password
+        
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    # Try to create the user first; useradd reports an existing user, which
+    # saves a separate lookup
+    result = create_user(username, password, role='admin', full_name='')
+    
+    if result['status'] == 'success':
+        logger.info(f"Admin user {username} created via first-run wizard")
+        return {
+            'status': 'success',
+            'message': f'User {username} created successfully'
+        }, 200
+    
+    if result.get('exists'):
+        # User exists, just change password and ensure in starlight-users group
+        result = change_password(username, password)
+        if result['status'] != 'success':
+            return {
+                'status': 'error',
+                'message': 'Failed to update existing user password'
+            }, 500
+        
+        # Ensure user is in starlight-users group
+        subprocess.run(['usermod', '-aG', 'starlight-users', username], check=False)
+        clear_user_cache()
+        
+        return {
+            'status': 'success',
+            'message': f'User {username} updated successfully'
+        }, 200
+    
+    return {
+        'status': 'error',
+        'message': result.get('message', 'Failed to create user')
+    }, 400
 
 
 @require_firstrun
@@ -201,75 +382,34 @@ async def create_admin_user(request: web.Request) -> web.Response:
     Body: {"username": "admin", "password": "password"}
     """
     try:
-        data = await request.json()
+        data = await _read_small_json(request)
+        if data is None:
+            return error_response('Invalid request body', 400)
         username = data.get('username', '').strip()
         password = data.get('password', '')
         
         if not username or not password:
-            return web.json_response({
-                'status': 'error',
-                'message': 'Username and password are required'
-            }, status=400)
+            return error_response('Username and password are required', 400)
         
         # Validate username
-        import re
-        if not re.match(r'^[a-z_][a-z0-9_-]*$', username):
-            return web.json_response({
-                'status': 'error',
-                'message': 'Invalid username format'
-            }, status=400)
+        if not USERNAME_PATTERN.match(username):
+            return error_response('Invalid username format', 400)
         
         if username == 'root':
-            return web.json_response({
-                'status': 'error',
-                'message': 'Cannot use root as username'
-            }, status=400)
+            return error_response('Cannot use root as username', 400)
         
         if len(password) < 8:
-            return web.json_response({
-                'status': 'error',
-                'message': 'Password must be at least 8 characters'
-            }, status=400)
-        
-        # Check if user already exists
-        if user_exists(username):
-            # User exists, just change password and ensure in starlight-users group
-            result = change_password(username, password)
-            if result['status'] != 'success':
-                return web.json_response({
-                    'status': 'error',
-                    'message': 'Failed to update existing user password'
-                }, status=500)
-            
-            # Ensure user is in starlight-users group
-            subprocess.run(['usermod', '-aG', 'starlight-users', username], check=False)
-            
-            return web.json_response({
-                'status': 'success',
-                'message': f'User {username} updated successfully'
-            })
-        
-        # Create new user
-        result = create_user(username, password, role='admin', full_name='')
+            return error_response('Password must be at least 8 characters', 400)
         
-        if result['status'] == 'success':
-            logger.info(f"Admin user {username} created via first-run wizard")
-            return web.json_response({
-                'status': 'success',
-                'message': f'User {username} created successfully'
-            })
-        else:
-            return web.json_response({
-                'status': 'error',
-                'message': result.get('message', 'Failed to create user')
-            }, status=400)
+        # Lookup, password change and group update all block, so they run
+        # off the event loop as one unit
+        loop = asyncio.get_running_loop()
+        body, status = await loop.run_in_executor(None, _ensure_admin_user, username, password)
+        return json_response(body, status=status)
     
     except Exception as e:
         logger.error(f"Error creating admin user: {e}")
-        return web.json_response({
-            'status': 'error',
-            'message': 'Failed to create admin user'
-        }, status=500)
+        return error_response('Failed to create admin user')
 
 
 @require_firstrun
@@ -281,56 +421,51 @@ async def set_hostname(request: web.Request) -> web.Response:
     Body: {"hostname": "starlight"}
     """
     try:
-        data = await request.json()
+        data = await _read_small_json(request)
+        if data is None:
+            return error_response('Invalid request body', 400)
         hostname = data.get('hostname', '').strip()
         
         if not hostname:
-            return web.json_response({
+            return json_response({
                 'status': 'skipped',
                 'message': 'No hostname provided, skipping'
             })
         
         # Validate hostname
-        import re
-        if not re.match(r'^[a-zA-Z0-9]([a-zA-Z0-9-]*[a-zA-Z0-9])?$', hostname):
-            return web.json_response({
-                'status': 'error',
-                'message': 'Invalid hostname format'
-            }, status=400)
+        if not HOSTNAME_PATTERN.match(hostname):
+            return error_response('Invalid hostname format', 400)
         
         try:
             # Set hostname using hostnamectl
-            subprocess.run(['hostnamectl', 'set-hostname', hostname], check=True)
+            returncode, _, stderr = await _run_command('hostnamectl', 'set-hostname', hostname)
+            if returncode != 0:
+                raise Exception(f"hostnamectl failed: {stderr.strip()}")
             
-            # Update /etc/hosts
-            with open('/etc/hosts', 'r') as f:
+            # Update /etc/hosts, reading and appending through one open file
+            with open('/etc/hosts', 'r+') as f:
                 hosts_content = f.read()
-            
-            # Add entry for new hostname if not present
-            if hostname not in hosts_content:
-                with open('/etc/hosts', 'a') as f:
+                
+                # Add entry for new hostname if no line maps it already;
+                # a plain substring check would match other entries
+                if not any(
+                    hostname in line.split('#', 1)[0].split()[1:]
+                    for line in hosts_content.splitlines()
+                ):
+                    f.seek(0, os.SEEK_END)
                     f.write(f'\n127.0.1.1\t{hostname}\n')
             
             logger.info(f"Hostname set to {hostname}")
             
-            return web.json_response({
-                'status': 'success',
-                'message': f'Hostname set to {hostname}'
-            })
+            return success_response(message=f'Hostname set to {hostname}')
         
         except Exception as e:
             logger.error(f"Failed to set hostname: {e}")
-            return web.json_response({
-                'status': 'error',
-                'message': 'Failed to set hostname'
-            }, status=500)
+            return error_response('Failed to set hostname')
     
     except Exception as e:
         logger.error(f"Error in set_hostname: {e}")
-        return web.json_response({
-            'status': 'error',
-            'message': 'An error occurred'
-        }, status=500)
+        return error_response('An error occurred')
 
 
 @require_firstrun
@@ -342,7 +477,9 @@ async def set_storage(request: web.Request) -> web.Response:
     Body: {"storage_path": "/var/lib/libvirt/images"}
     """
     try:
-        data = await request.json()
+        data = await _read_small_json(request)
+        if data is None:
+            return error_response('Invalid request body', 400)
         storage_path = data.get('storage_path', '/var/lib/libvirt/images').strip()
         
         if not storage_path:
@@ -350,20 +487,15 @@ async def set_storage(request: web.Request) -> web.Response:
         
         # Validate path
         if not storage_path.startswith('/'):
-            return web.json_response({
-                'status': 'error',
-                'message': 'Storage path must be an absolute path'
-            }, status=400)
+            return error_response('Storage path must be an absolute path', 400)
         
         try:
             # Create directory if it doesn't exist
             os.makedirs(storage_path, mode=0o755, exist_ok=True)
             
-            # Test write access
-            test_file = os.path.join(storage_path, '.starlight-test')
-            with open(test_file, 'w') as f:
-                f.write('test')
-            os.remove(test_file)
+            # Check write access without creating a test file
+            if not os.access(storage_path, os.W_OK | os.X_OK):
+                raise PermissionError(storage_path)
             
             # Ensure config directories exist
             ensure_config_directories()
@@ -392,30 +524,42 @@ async def set_storage(request: web.Request) -> web.Response:
                 logger.warning(f"Could not connect to libvirt during setup: {e}")
             
             logger.info(f"Storage path set to {storage_path}")
+            _invalidate_disk_usage_cache()
             
-            return web.json_response({
-                'status': 'success',
-                'message': f'Storage configured at {storage_path}'
-            })
+            return success_response(message=f'Storage configured at {storage_path}')
         
         except PermissionError:
-            return web.json_response({
-                'status': 'error',
-                'message': 'Permission denied: cannot write to storage path'
-            }, status=400)
+            return error_response('Permission denied: cannot write to storage path', 400)
         except Exception as e:
             logger.error(f"Failed to configure storage: {e}")
-            return web.json_response({
-                'status': 'error',
-                'message': 'Failed to configure storage'
-            }, status=500)
+            return error_response('Failed to configure storage')
     
     except Exception as e:
         logger.error(f"Error in set_storage: {e}")
-        return web.json_response({
-            'status': 'error',
-            'message': 'An error occurred'
-        }, status=500)
+        return error_response('An error occurred')
+
+
+def _write_firstrun_flags():
+    """Replace the needs-firstrun flag with the firstrun-complete flag. Blocking."""
+    os.makedirs(STARLIGHT_CONFIG_DIR, exist_ok=True)
+    # Resolve the config directory once and work on both flags relative to it
+    dir_fd = os.open(STARLIGHT_CONFIG_DIR, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        # Remove the needs-firstrun flag
+        try:
+            os.unlink(os.path.basename(FIRSTRUN_FLAG), dir_fd=dir_fd)
+        except FileNotFoundError:
+            pass
+        
+        # Create the firstrun-complete flag
+        fd = os.open(os.path.basename(FIRSTRUN_COMPLETE_FLAG),
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=dir_fd)
+        try:
+            os.write(fd, b'completed')
+        finally:
+            os.close(fd)
+    finally:
+        os.close(dir_fd)
 
 
 @require_firstrun
@@ -425,46 +569,44 @@ async def complete_firstrun(request: web.Request) -> web.Response:
     
     POST /api/firstrun/complete
     """
+    global _firstrun_completed
     try:
-        # Remove the needs-firstrun flag
-        if os.path.exists(FIRSTRUN_FLAG):
-            os.remove(FIRSTRUN_FLAG)
-        
-        # Create the firstrun-complete flag
-        os.makedirs(STARLIGHT_CONFIG_DIR, exist_ok=True)
-        with open(FIRSTRUN_COMPLETE_FLAG, 'w') as f:
-            f.write('completed')
+        # Flag files are written off the event loop; the completed state is
+        # cached only once the write has finished
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _write_firstrun_flags)
+        _firstrun_completed = True
         
         # Switch nginx configuration from firstrun to normal
         try:
             nginx_sites_enabled = '/etc/nginx/sites-enabled'
             nginx_sites_available = '/etc/nginx/sites-available'
             
-            # Remove firstrun config
             firstrun_link = os.path.join(nginx_sites_enabled, 'default')
-            if os.path.islink(firstrun_link):
-                os.remove(firstrun_link)
-            
-            # Enable normal Starlight config
             starlight_config = os.path.join(nginx_sites_available, 'starlight')
             if os.path.exists(starlight_config):
-                os.symlink(starlight_config, firstrun_link)
+                # Enable normal Starlight config by renaming a new link over
+                # the firstrun one, so the default site never goes missing
+                tmp_link = firstrun_link + '.new'
+                try:
+                    os.unlink(tmp_link)
+                except FileNotFoundError:
+                    pass
+                os.symlink(starlight_config, tmp_link)
+                os.replace(tmp_link, firstrun_link)
+            elif os.path.islink(firstrun_link):
+                # Remove firstrun config
+                os.remove(firstrun_link)
             
             # Reload nginx
-            subprocess.run(['systemctl', 'reload', 'nginx'], check=False)
+            await _run_command('systemctl', 'reload', 'nginx')
         except Exception as e:
             logger.warning(f"Failed to switch nginx config: {e}")
         
         logger.info("First-run wizard completed successfully")
         
-        return web.json_response({
-            'status': 'success',
-            'message': 'First-run wizard completed'
-        })
+        return success_response(message='First-run wizard completed')
     
     except Exception as e:
         logger.error(f"Error completing first-run: {e}")
-        return web.json_response({
-            'status': 'error',
-            'message': 'Failed to complete first-run wizard'
-        }, status=500)
+        return error_response('Failed to complete first-run wizard')
@@ -10,12 +10,13 @@ import logging
 import asyncio
 import aiohttp
 from pathlib import Path
-from aiohttp import web
 from urllib.parse import urlparse
 
 from ..config_loader import get_iso_storage_path
 from ..handlers.download_handlers import download_progress
 from ..utils.libvirt_connection import get_connection
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
 import libvirt
 
 logger = logging.getLogger(__name__)
@@ -176,13 +177,13 @@ async def list_isos(request):
         # Sort by modification time (newest first)
         isos.sort(key=lambda x: x['modified'], reverse=True)
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'isos': isos
         })
     except Exception as e:
         logger.error(f"Error listing ISOs: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Failed to list ISOs: {str(e)}'
         }, status=500)
@@ -211,7 +212,7 @@ async def upload_iso(request):
         field = await reader.next()
         if field is None:
             logger.error("No file field in multipart data")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': 'No file provided'
             }, status=400)
@@ -221,7 +222,7 @@ async def upload_iso(request):
         logger.info(f"Upload field filename: {filename}")
         if not filename:
             logger.error("No filename in field")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': 'No filename provided'
             }, status=400)
@@ -232,14 +233,14 @@ async def upload_iso(request):
             logger.info(f"Sanitized filename: {filename}")
         except ValueError as e:
             logger.error(f"Filename sanitization failed: {e}")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': f'Invalid filename: {str(e)}'
             }, status=400)
         
         if not filename.lower().endswith('.iso'):
             logger.error(f"File doesn't have .iso extension: {filename}")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': 'File must have .iso extension'
             }, status=400)
@@ -251,7 +252,7 @@ async def upload_iso(request):
         # Check if file already exists
         if os.path.exists(file_path):
             logger.warning(f"File already exists: {filename}")
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': f'File {filename} already exists'
             }, status=409)
@@ -308,7 +309,7 @@ async def upload_iso(request):
         
         logger.info(f"ISO uploaded successfully: {filename} ({bytes_written} bytes)")
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'message': f'ISO {filename} uploaded successfully',
             'filename': filename,
@@ -333,7 +334,7 @@ async def upload_iso(request):
             # Schedule cleanup of error entry
             asyncio.create_task(_cleanup_progress_entry(upload_key))
         
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Failed to upload ISO: {str(e)}'
         }, status=500)
@@ -346,9 +347,9 @@ async def download_iso(request):
     Accepts URL and filename, downloads to ISO storage path.
     """
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except Exception:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Invalid JSON body'
         }, status=400)
@@ -357,14 +358,14 @@ async def download_iso(request):
     filename = data.get('filename')
     
     if not url or not filename:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'URL and filename are required'
         }, status=400)
     
     # Validate URL to prevent SSRF attacks
     if not validate_download_url(url):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Invalid URL. Only HTTP/HTTPS URLs to public addresses are allowed.'
         }, status=400)
@@ -373,7 +374,7 @@ async def download_iso(request):
     try:
         filename = sanitize_filename(filename)
     except ValueError as e:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Invalid filename: {str(e)}'
         }, status=400)
@@ -390,7 +391,7 @@ async def download_iso(request):
     
     # Check if file already exists
     if os.path.exists(file_path):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'File {filename} already exists'
         }, status=409)
@@ -408,7 +409,7 @@ async def download_iso(request):
     # Start download in background
     asyncio.create_task(_download_iso_background(url, file_path, filename, download_key))
     
-    return web.json_response({
+    return json_response({
         'status': 'success',
         'message': f'Download started for {filename}',
         'download_key': download_key
@@ -492,7 +493,7 @@ async def delete_iso(request):
     filename = request.match_info.get('filename')
     
     if not filename:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Filename is required'
         }, status=400)
@@ -501,7 +502,7 @@ async def delete_iso(request):
     try:
         filename = sanitize_filename(filename)
     except ValueError as e:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Invalid filename: {str(e)}'
         }, status=400)
@@ -511,14 +512,14 @@ async def delete_iso(request):
     
     # Check if file exists
     if not os.path.exists(file_path):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'ISO file {filename} not found'
         }, status=404)
     
     # Check if ISO is in use
     if is_iso_in_use(file_path):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'ISO {filename} is currently in use by a VM and cannot be deleted'
         }, status=409)
@@ -527,13 +528,13 @@ async def delete_iso(request):
         os.remove(file_path)
         logger.info(f"ISO deleted successfully: {filename}")
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'message': f'ISO {filename} deleted successfully'
         })
     except Exception as e:
         logger.error(f"Error deleting ISO: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Failed to delete ISO: {str(e)}'
         }, status=500)
@@ -563,7 +564,7 @@ async def get_iso_storage_info(request):
         iso_count = sum(1 for entry in os.scandir(iso_storage_path) 
                        if entry.is_file() and entry.name.lower().endswith('.iso'))
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'total_space': total_space,
             'used_space': used_space,
@@ -576,7 +577,7 @@ async def get_iso_storage_info(request):
         })
     except Exception as e:
         logger.error(f"Error getting storage info: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Failed to get storage info: {str(e)}'
         }, status=500)
@@ -18,6 +18,8 @@ from ..config_loader import (
     NETWORK_CONFIG_PATH,
 )
 from ..auth.user_management import is_admin
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -144,9 +146,9 @@ async def get_network_config_handler(request: web.Request) -> web.Response:
         JSON response with network configuration
     """
     try:
-        config = get_network_config(force_reload=True)
+        config = get_network_config()
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'config': {
                 'mode': config.get('mode', 'dhcp'),
@@ -160,7 +162,7 @@ async def get_network_config_handler(request: web.Request) -> web.Response:
         })
     except Exception as e:
         logger.error(f"Error getting network config: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Failed to retrieve network configuration'
         }, status=500)
@@ -191,21 +193,21 @@ async def update_network_config_handler(request: web.Request) -> web.Response:
     username = user_info.get('username', '')
     
     if not is_admin(username) and username != 'root':
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Admin privileges required to modify network configuration'
         }, status=403)
     
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except Exception:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Invalid JSON body'
         }, status=400)
     
     # Get current config
-    current_config = get_network_config(force_reload=True)
+    current_config = get_network_config()
     
     # Validate and update
     errors = []
@@ -246,7 +248,7 @@ async def update_network_config_handler(request: web.Request) -> web.Response:
         errors.append('Invalid secondary DNS format')
     
     if errors:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Validation failed',
             'errors': errors
@@ -265,14 +267,14 @@ async def update_network_config_handler(request: web.Request) -> web.Response:
     
     # Save configuration
     if not save_network_config(new_config):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Failed to save network configuration'
         }, status=500)
     
     logger.info(f"Network configuration updated by {username}")
     
-    return web.json_response({
+    return json_response({
         'status': 'success',
         'message': 'Network configuration saved. Changes will take effect after applying network settings.',
         'config': new_config,
@@ -295,7 +297,7 @@ async def get_network_status_handler(request: web.Request) -> web.Response:
         primary_interface = get_primary_interface()
         dns_servers = get_current_dns_servers()
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'network_status': {
                 'ip_address': current_ip,
@@ -306,7 +308,7 @@ async def get_network_status_handler(request: web.Request) -> web.Response:
         })
     except Exception as e:
         logger.error(f"Error getting network status: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Failed to retrieve network status'
         }, status=500)
@@ -6,13 +6,15 @@ This module provides HTTP request handlers for managing VM/LXC template reposito
 
 import json
 import logging
-from aiohttp import web
 
 from .vm_deployment import (
     load_repositories_config, 
     save_repositories_config, 
     fetch_repository_apps
 )
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
+from ..utils.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -20,18 +22,19 @@ logger = logging.getLogger(__name__)
 async def list_repositories(request):
     """Returns the list of configured repositories."""
     config = load_repositories_config()
-    return web.json_response({'status': 'success', 'repositories': config.get('repositories', [])})
+    return json_response({'status': 'success', 'repositories': config.get('repositories', [])})
 
 
 async def get_all_apps(request):
     """Fetches and aggregates apps from all enabled repositories."""
     config = load_repositories_config()
     all_apps = []
+    session = get_http_session(request.app)
     
     # Fetch apps from all enabled repositories
     for repo in config.get('repositories', []):
         if repo.get('enabled', False):
-            apps = await fetch_repository_apps(repo['url'])
+            apps = await fetch_repository_apps(session, repo['url'])
             if apps:
                 # Add repository metadata to each app
                 for app in apps:
@@ -39,18 +42,19 @@ async def get_all_apps(request):
                     app['repo_name'] = repo['name']
                 all_apps.extend(apps)
     
-    return web.json_response({'status': 'success', 'apps': all_apps, 'total': len(all_apps)})
+    return json_response({'status': 'success', 'apps': all_apps, 'total': len(all_apps)})
 
 
 async def get_all_themes(request):
     """Fetches and aggregates themes from all enabled repositories."""
     config = load_repositories_config()
     all_themes = []
+    session = get_http_session(request.app)
     
     # Fetch items from all enabled repositories
     for repo in config.get('repositories', []):
         if repo.get('enabled', False):
-            items = await fetch_repository_apps(repo['url'])
+            items = await fetch_repository_apps(session, repo['url'])
             if items:
                 # Filter for themes only and add repository metadata
                 for item in items:
@@ -59,29 +63,29 @@ async def get_all_themes(request):
                         item['repo_name'] = repo['name']
                         all_themes.append(item)
     
-    return web.json_response({'status': 'success', 'themes': all_themes, 'total': len(all_themes)})
+    return json_response({'status': 'success', 'themes': all_themes, 'total': len(all_themes)})
 
 
 async def add_repository(request):
     """Adds a new repository to the configuration."""
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
     
     repo_id = data.get('id')
     name = data.get('name')
     url = data.get('url')
     
     if not all([repo_id, name, url]):
-        return web.json_response({'status': 'error', 'message': 'Missing required fields: id, name, url'}, status=400)
+        return json_response({'status': 'error', 'message': 'Missing required fields: id, name, url'}, status=400)
     
     config = load_repositories_config()
     
     # Check if repo_id already exists
     for repo in config['repositories']:
         if repo['id'] == repo_id:
-            return web.json_response({'status': 'error', 'message': f'Repository with id {repo_id} already exists.'}, status=409)
+            return json_response({'status': 'error', 'message': f'Repository with id {repo_id} already exists.'}, status=409)
     
     # Add new repository
     new_repo = {
@@ -94,9 +98,9 @@ async def add_repository(request):
     config['repositories'].append(new_repo)
     
     if save_repositories_config(config):
-        return web.json_response({'status': 'success', 'message': f'Repository {name} added successfully.', 'repository': new_repo})
+        return json_response({'status': 'success', 'message': f'Repository {name} added successfully.', 'repository': new_repo})
     else:
-        return web.json_response({'status': 'error', 'message': 'Failed to save configuration.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Failed to save configuration.'}, status=500)
 
 
 async def update_repository(request):
@@ -104,9 +108,9 @@ async def update_repository(request):
     repo_id = request.match_info.get('id')
     
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
     
     config = load_repositories_config()
     
@@ -123,11 +127,11 @@ async def update_repository(request):
                 repo['description'] = data['description']
             
             if save_repositories_config(config):
-                return web.json_response({'status': 'success', 'message': f'Repository {repo_id} updated successfully.', 'repository': repo})
+                return json_response({'status': 'success', 'message': f'Repository {repo_id} updated successfully.', 'repository': repo})
             else:
-                return web.json_response({'status': 'error', 'message': 'Failed to save configuration.'}, status=500)
+                return json_response({'status': 'error', 'message': 'Failed to save configuration.'}, status=500)
     
-    return web.json_response({'status': 'error', 'message': f'Repository {repo_id} not found.'}, status=404)
+    return json_response({'status': 'error', 'message': f'Repository {repo_id} not found.'}, status=404)
 
 
 async def delete_repository(request):
@@ -141,9 +145,9 @@ async def delete_repository(request):
     config['repositories'] = [repo for repo in config['repositories'] if repo['id'] != repo_id]
     
     if len(config['repositories']) == original_length:
-        return web.json_response({'status': 'error', 'message': f'Repository {repo_id} not found.'}, status=404)
+        return json_response({'status': 'error', 'message': f'Repository {repo_id} not found.'}, status=404)
     
     if save_repositories_config(config):
-        return web.json_response({'status': 'success', 'message': f'Repository {repo_id} removed successfully.'})
+        return json_response({'status': 'success', 'message': f'Repository {repo_id} removed successfully.'})
     else:
-        return web.json_response({'status': 'error', 'message': 'Failed to save configuration.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Failed to save configuration.'}, status=500)
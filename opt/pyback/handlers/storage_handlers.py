@@ -19,6 +19,8 @@ from ..config_loader import (
     STORAGE_CONFIG_PATH,
 )
 from ..auth.user_management import is_admin
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -68,9 +70,9 @@ async def get_storage_config_handler(request: web.Request) -> web.Response:
         JSON response with storage configuration
     """
     try:
-        config = get_storage_config(force_reload=True)
+        config = get_storage_config()
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'config': {
                 'vm_storage_path': config.get('vm_storage_path', '/var/lib/libvirt/images'),
@@ -80,7 +82,7 @@ async def get_storage_config_handler(request: web.Request) -> web.Response:
         })
     except Exception as e:
         logger.error(f"Error getting storage config: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Failed to retrieve storage configuration'
         }, status=500)
@@ -107,21 +109,21 @@ async def update_storage_config_handler(request: web.Request) -> web.Response:
     username = user_info.get('username', '')
     
     if not is_admin(username) and username != 'root':
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Admin privileges required to modify storage configuration'
         }, status=403)
     
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Invalid JSON body'
         }, status=400)
     
-    # Get current config
-    current_config = get_storage_config(force_reload=True)
+    # Work on a copy; the cached config must not see unsaved changes
+    current_config = dict(get_storage_config())
     
     # Validate and update paths
     errors = []
@@ -166,7 +168,7 @@ async def update_storage_config_handler(request: web.Request) -> web.Response:
     
     # Return errors if any
     if errors:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Validation failed',
             'errors': errors
@@ -174,7 +176,7 @@ async def update_storage_config_handler(request: web.Request) -> web.Response:
     
     # Save configuration
     if not save_storage_config(current_config):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Failed to save storage configuration'
         }, status=500)
@@ -188,7 +190,7 @@ async def update_storage_config_handler(request: web.Request) -> web.Response:
     if warnings:
         response['warnings'] = warnings
     
-    return web.json_response(response)
+    return json_response(response)
 
 
 async def get_storage_info_handler(request: web.Request) -> web.Response:
@@ -201,7 +203,7 @@ async def get_storage_info_handler(request: web.Request) -> web.Response:
         JSON response with storage information for VM and ISO paths
     """
     try:
-        config = get_storage_config(force_reload=True)
+        config = get_storage_config()
         
         vm_path = config.get('vm_storage_path', '/var/lib/libvirt/images')
         iso_path = config.get('iso_storage_path', '/var/lib/libvirt/isos')
@@ -238,7 +240,7 @@ async def get_storage_info_handler(request: web.Request) -> web.Response:
         iso_info['file_count'] = iso_file_count
         iso_info['content_size_bytes'] = iso_total_size
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'info': {
                 'vm_storage': vm_info,
@@ -248,7 +250,7 @@ async def get_storage_info_handler(request: web.Request) -> web.Response:
         
     except Exception as e:
         logger.error(f"Error getting storage info: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Failed to retrieve storage information'
         }, status=500)
@@ -269,9 +271,9 @@ async def validate_storage_path_handler(request: web.Request) -> web.Response:
         JSON response with validation results
     """
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Invalid JSON body'
         }, status=400)
@@ -279,13 +281,13 @@ async def validate_storage_path_handler(request: web.Request) -> web.Response:
     path = data.get('path', '').strip()
     
     if not path:
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Path is required'
         }, status=400)
     
     if not path.startswith('/'):
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': 'Path must be an absolute path',
             'valid': False
@@ -331,7 +333,7 @@ async def validate_storage_path_handler(request: web.Request) -> web.Response:
         except Exception:
             pass
     
-    return web.json_response({
+    return json_response({
         'status': 'success',
         'validation': validation
     })
@@ -6,9 +6,9 @@ This module provides HTTP request handlers for system reboot and shutdown operat
 
 import logging
 import subprocess
-from aiohttp import web
 
 from ..auth.middleware import require_admin
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +35,13 @@ async def reboot_system(request):
                         stdout=subprocess.DEVNULL, 
                         stderr=subprocess.DEVNULL)
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'message': 'Server reboot initiated'
         })
     except Exception as e:
         logger.error(f"Error initiating server reboot: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Failed to reboot server: {str(e)}'
         }, status=500)
@@ -66,13 +66,13 @@ async def shutdown_system(request):
                         stdout=subprocess.DEVNULL, 
                         stderr=subprocess.DEVNULL)
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'message': 'Server shutdown initiated'
         })
     except Exception as e:
         logger.error(f"Error initiating server shutdown: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': f'Failed to shutdown server: {str(e)}'
         }, status=500)
@@ -8,7 +8,6 @@ import os
 import json
 import logging
 from datetime import datetime
-from aiohttp import web
 
 from ..config_loader import ROLLBACK_DIR as BACKUP_DIR
 from ..updater.backup import load_update_config, save_update_config
@@ -19,6 +18,8 @@ from ..updater.system import (
     schedule_service_restart,
     rollback_update
 )
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -33,14 +34,14 @@ async def get_update_status(request):
         config['last_check'] = datetime.now().isoformat()
         save_update_config(config)
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'current_version': current_version,
             'config': config
         })
     except Exception as e:
         logger.error(f"Error getting update status: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -52,7 +53,7 @@ async def check_updates(request):
         update_info = check_for_updates()
         
         if update_info is None:
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': 'Failed to check for updates'
             }, status=500)
@@ -62,13 +63,13 @@ async def check_updates(request):
         config['last_check'] = datetime.now().isoformat()
         save_update_config(config)
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'update_info': update_info
         })
     except Exception as e:
         logger.error(f"Error checking for updates: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -85,13 +86,13 @@ async def trigger_update(request):
             if result.get('restart_required'):
                 schedule_service_restart()
             
-            return web.json_response({
+            return json_response({
                 'status': 'success',
                 'message': result['message'],
                 'restart_required': result.get('restart_required', False)
             })
         else:
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': result.get('error', 'Update failed'),
                 'rollback_attempted': result.get('rollback_attempted', False),
@@ -99,7 +100,7 @@ async def trigger_update(request):
             }, status=500)
     except Exception as e:
         logger.error(f"Error triggering update: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -108,7 +109,7 @@ async def trigger_update(request):
 async def update_auto_update_config(request):
     """Updates the auto-update configuration."""
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
         
         config = load_update_config()
         
@@ -119,19 +120,19 @@ async def update_auto_update_config(request):
             config['update_channel'] = data['update_channel']
         
         if save_update_config(config):
-            return web.json_response({
+            return json_response({
                 'status': 'success',
                 'message': 'Configuration updated successfully',
                 'config': config
             })
         else:
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': 'Failed to save configuration'
             }, status=500)
     except Exception as e:
         logger.error(f"Error updating auto-update config: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -141,7 +142,7 @@ async def get_update_history(request):
     """Returns the update history from backups."""
     try:
         if not os.path.exists(BACKUP_DIR):
-            return web.json_response({
+            return json_response({
                 'status': 'success',
                 'backups': []
             })
@@ -159,13 +160,13 @@ async def get_update_history(request):
         # Sort by timestamp, newest first
         backups.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'backups': backups
         })
     except Exception as e:
         logger.error(f"Error getting update history: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
@@ -174,11 +175,11 @@ async def get_update_history(request):
 async def perform_rollback(request):
     """Performs a rollback to a previous version."""
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
         commit_hash = data.get('commit')
         
         if not commit_hash:
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': 'Commit hash is required'
             }, status=400)
@@ -189,19 +190,19 @@ async def perform_rollback(request):
             # Schedule service restart
             schedule_service_restart()
             
-            return web.json_response({
+            return json_response({
                 'status': 'success',
                 'message': result['message'],
                 'restart_required': True
             })
         else:
-            return web.json_response({
+            return json_response({
                 'status': 'error',
                 'message': result.get('error', 'Rollback failed')
             }, status=500)
     except Exception as e:
         logger.error(f"Error performing rollback: {e}")
-        return web.json_response({
+        return json_response({
             'status': 'error',
             'message': str(e)
         }, status=500)
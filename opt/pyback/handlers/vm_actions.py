@@ -9,11 +9,11 @@ import os
 import shutil
 import logging
 import libvirt
-from aiohttp import web
 
 from ..config_loader import get_default_pool_name, get_vm_storage_path
 from ..utils.libvirt_connection import get_connection, get_domain_by_name
 from ..models.lxc import get_lxc_metadata, load_lxc_metadata, save_lxc_metadata
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -56,11 +56,11 @@ async def vm_action(request):
             conn_type = 'qemu' if domain else 'lxc'
     
     if not conn:
-        return web.json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
     
     if not domain:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'VM/Container named {name} not found.'}, status=404)
+        return json_response({'status': 'error', 'message': f'VM/Container named {name} not found.'}, status=404)
 
     try:
         entity_type = "Container" if conn_type == 'lxc' else "VM"
@@ -139,11 +139,11 @@ async def vm_action(request):
             
         else:
             conn.close()
-            return web.json_response({'status': 'error', 'message': f'Invalid action: {action}'}, status=400)
+            return json_response({'status': 'error', 'message': f'Invalid action: {action}'}, status=400)
 
         conn.close()
-        return web.json_response({'status': 'success', 'message': message})
+        return json_response({'status': 'success', 'message': message})
 
     except libvirt.libvirtError as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Libvirt operation failed: {e}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Libvirt operation failed: {e}'}, status=500)
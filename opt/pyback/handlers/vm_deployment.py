@@ -13,7 +13,6 @@ import asyncio
 import aiohttp
 import libvirt
 import time
-from aiohttp import web
 from xml.etree import ElementTree as ET
 
 from ..config_loader import (
@@ -26,6 +25,10 @@ from ..utils.file_operations import decompress_xz_file, extract_tar_xz_rootfs
 from ..models.vm import set_vm_metadata
 from ..models.lxc import set_lxc_metadata
 from ..storage.volume import create_storage_volume
+from .download_handlers import TERMINAL_STATUSES, schedule_download_cleanup
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
+from ..utils.http_client import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +41,12 @@ def update_download_status(vm_name, status, message=None, progress=None, total=N
     if vm_name not in download_progress:
         download_progress[vm_name] = {}
     
+    timestamp = time.time()
     download_progress[vm_name]['status'] = status
-    download_progress[vm_name]['timestamp'] = time.time()
+    download_progress[vm_name]['timestamp'] = timestamp
+    
+    if status in TERMINAL_STATUSES:
+        schedule_download_cleanup(vm_name, timestamp)
     
     if message is not None:
         download_progress[vm_name]['message'] = message
@@ -83,17 +90,16 @@ def save_repositories_config(config):
         return False
 
 
-async def fetch_repository_apps(repo_url):
-    """Fetches apps from a single repository URL."""
+async def fetch_repository_apps(session, repo_url):
+    """Fetches apps from a single repository URL using the given client session."""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(repo_url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-                if resp.status != 200:
-                    return None
-                # GitHub raw URLs return text/plain, so read as text and parse manually
-                text = await resp.text()
-                data = json.loads(text)
-                return data.get('apps', [])
+        async with session.get(repo_url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+            if resp.status != 200:
+                return None
+            # GitHub raw URLs return text/plain, so read as text and parse manually
+            text = await resp.text()
+            data = json.loads(text)
+            return data.get('apps', [])
     except Exception as e:
         logger.error(f"Error fetching apps from {repo_url}: {e}")
         return None
@@ -106,9 +112,9 @@ async def deploy_vm_from_url(request):
     Supports both VMs and LXC containers based on 'type' field.
     """
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
 
     logger.info(f"Deploy request body: {json.dumps(data, indent=2)}")
 
@@ -133,7 +139,7 @@ async def deploy_vm_from_url(request):
     logger.info(f"Deploy request received - Name: {vm_name}, Type: {deploy_type}, XML URL: {xml_url}, Image URL: {cloud_image_url}, Icon: {icon_url}")
 
     if not all([xml_url, vm_name, disk_size_gb]):
-        return web.json_response({'status': 'error', 'message': 'Missing XML URL, VM name, or required disk size.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Missing XML URL, VM name, or required disk size.'}, status=400)
     
     # Validate that LXC containers have a rootfs source
     if deploy_type == 'lxc' and not cloud_image_url and not iso_path:
@@ -143,22 +149,22 @@ async def deploy_vm_from_url(request):
     conn_type = 'lxc' if deploy_type == 'lxc' else 'qemu'
     conn = get_connection(conn_type)
     if not conn:
-        return web.json_response({'status': 'error', 'message': f'Could not connect to libvirt ({conn_type}).'}, status=500)
+        return json_response({'status': 'error', 'message': f'Could not connect to libvirt ({conn_type}).'}, status=500)
     
     if get_domain_by_name(conn, vm_name):
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'{"Container" if deploy_type == "lxc" else "VM"} named {vm_name} already exists.'}, status=409)
+        return json_response({'status': 'error', 'message': f'{"Container" if deploy_type == "lxc" else "VM"} named {vm_name} already exists.'}, status=409)
 
     # 1. Fetch the XML from the remote URL
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(xml_url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                if resp.status != 200:
-                    raise Exception(f"Failed to fetch XML from {xml_url}. Status: {resp.status}")
-                xml_config = await resp.text()
+        session = get_http_session(request.app)
+        async with session.get(xml_url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            if resp.status != 200:
+                raise Exception(f"Failed to fetch XML from {xml_url}. Status: {resp.status}")
+            xml_config = await resp.text()
     except Exception as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Remote XML fetch error: {e}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Remote XML fetch error: {e}'}, status=500)
         
     # 2. Create the disk/rootfs - either empty or download a cloud image/rootfs
     disk_path = None
@@ -429,7 +435,7 @@ async def deploy_vm_from_url(request):
         if vm_name in download_progress:
             update_download_status(vm_name, 'error', str(e))
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Disk creation failed: {e}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Disk creation failed: {e}'}, status=500)
 
     # Parse and modify the XML to inject the specific disk path and network configuration
     try:
@@ -561,7 +567,7 @@ async def deploy_vm_from_url(request):
         except:
             pass
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'XML modification error: {e}. Disk creation rolled back.'}, status=500)
+        return json_response({'status': 'error', 'message': f'XML modification error: {e}. Disk creation rolled back.'}, status=500)
 
     # 3. Define and Start the domain
     try:
@@ -597,11 +603,11 @@ async def deploy_vm_from_url(request):
         logger.info(f"{entity_type} {vm_name} successfully deployed and started")
         
         if cloud_image_url:
-            return web.json_response({'status': 'success', 'message': f'{entity_type} {vm_name} deployed from cloud image and started with a {disk_size_gb}GB disk.'})
+            return json_response({'status': 'success', 'message': f'{entity_type} {vm_name} deployed from cloud image and started with a {disk_size_gb}GB disk.'})
         elif iso_path:
-            return web.json_response({'status': 'success', 'message': f'{entity_type} {vm_name} created with installation ISO. Complete installation via VNC console.'})
+            return json_response({'status': 'success', 'message': f'{entity_type} {vm_name} created with installation ISO. Complete installation via VNC console.'})
         else:
-            return web.json_response({'status': 'success', 'message': f'{entity_type} {vm_name} deployed with empty disk. Attach an ISO or image to install an OS.'})
+            return json_response({'status': 'success', 'message': f'{entity_type} {vm_name} deployed with empty disk. Attach an ISO or image to install an OS.'})
         
     except libvirt.libvirtError as e:
         # Better error handling - don't try to delete things that might not exist
@@ -610,10 +616,10 @@ async def deploy_vm_from_url(request):
         if vm_name in download_progress:
             update_download_status(vm_name, 'error', f'VM creation failed: {error_message}')
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Libvirt operation failed during deployment: {error_message}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Libvirt operation failed during deployment: {error_message}'}, status=500)
     except Exception as e:
         logger.error(f"Unexpected error for {vm_name}: {e}")
         if vm_name in download_progress:
             update_download_status(vm_name, 'error', str(e))
         conn.close()
-        return web.json_response({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
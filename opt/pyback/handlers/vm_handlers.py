@@ -11,7 +11,6 @@ import logging
 import asyncio
 import random
 import libvirt
-from aiohttp import web
 from xml.etree import ElementTree as ET
 
 from ..config_loader import (
@@ -23,6 +22,8 @@ from ..utils.file_operations import sanitize_vm_name
 from ..models.vm import get_domain_info, get_vm_metadata, set_vm_metadata, rename_vm_metadata
 from ..models.lxc import get_lxc_metadata
 from ..storage.volume import create_storage_volume
+from ..utils.json_utils import json_loads
+from ..utils.responses import json_response
 
 logger = logging.getLogger(__name__)
 
@@ -77,17 +78,17 @@ async def list_vms(request):
             logger.error(f"Error listing LXC containers: {e}")
     
     if not conn and not lxc_conn:
-        return web.json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
     
-    return web.json_response({'status': 'success', 'vms': vm_list})
+    return json_response({'status': 'success', 'vms': vm_list})
 
 
 async def create_vm(request):
     """Defines a persistent VM and starts it immediately."""
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
         
     name = data.get('name')
     memory_mb = data.get('memory_mb')
@@ -96,22 +97,22 @@ async def create_vm(request):
     disk_size_gb = data.get('disk_size_gb')
 
     if not all([name, memory_mb, vcpus, disk_size_gb]):
-        return web.json_response({'status': 'error', 'message': 'Missing name, memory, vcpus, or disk_size_gb.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Missing name, memory, vcpus, or disk_size_gb.'}, status=400)
 
     conn = get_connection()
     if not conn:
-        return web.json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
     
     if get_domain_by_name(conn, name):
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'VM named {name} already exists.'}, status=409)
+        return json_response({'status': 'error', 'message': f'VM named {name} already exists.'}, status=409)
 
     # 1. Create the virtual disk image
     try:
         disk_path = create_storage_volume(conn, name, disk_size_gb)
     except Exception as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Disk creation failed: {e}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Disk creation failed: {e}'}, status=500)
         
     # 2. Build XML Configuration
     memory_kib = memory_mb * 1024
@@ -129,7 +130,7 @@ async def create_vm(request):
     if iso_path:
         if not os.path.isfile(iso_path):
             conn.close()
-            return web.json_response({'status': 'error', 'message': f"ISO file not found at path: {iso_path}."}, status=400)
+            return json_response({'status': 'error', 'message': f"ISO file not found at path: {iso_path}."}, status=400)
 
         disk_config += f"""
         <disk type='file' device='cdrom'>
@@ -205,14 +206,14 @@ async def create_vm(request):
         domain.create()
         
         conn.close()
-        return web.json_response({'status': 'success', 'message': f'Domain {name} defined and started persistently with a {disk_size_gb}GB disk.'})
+        return json_response({'status': 'success', 'message': f'Domain {name} defined and started persistently with a {disk_size_gb}GB disk.'})
     
     except libvirt.libvirtError as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Libvirt operation failed: {e}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Libvirt operation failed: {e}'}, status=500)
     except Exception as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 
 async def get_vm_disk_info(request):
@@ -221,12 +222,12 @@ async def get_vm_disk_info(request):
     
     conn = get_connection()
     if not conn:
-        return web.json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
     
     domain = get_domain_by_name(conn, name)
     if not domain:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'VM named {name} not found.'}, status=404)
+        return json_response({'status': 'error', 'message': f'VM named {name} not found.'}, status=404)
     
     try:
         # Get XML and extract disk path and target device
@@ -236,17 +237,17 @@ async def get_vm_disk_info(request):
         disk_element = root.find("./devices/disk[@type='file'][@device='disk']")
         if disk_element is None:
             conn.close()
-            return web.json_response({'status': 'error', 'message': 'No disk found for this VM.'}, status=404)
+            return json_response({'status': 'error', 'message': 'No disk found for this VM.'}, status=404)
         
         source_element = disk_element.find('source')
         if source_element is None:
             conn.close()
-            return web.json_response({'status': 'error', 'message': 'Disk has no source path.'}, status=404)
+            return json_response({'status': 'error', 'message': 'Disk has no source path.'}, status=404)
         
         disk_path = source_element.get('file')
         if not disk_path or not os.path.exists(disk_path):
             conn.close()
-            return web.json_response({'status': 'error', 'message': f'Disk file not found at {disk_path}'}, status=404)
+            return json_response({'status': 'error', 'message': f'Disk file not found at {disk_path}'}, status=404)
         
         # Get target device name and format from XML
         target_element = disk_element.find('target')
@@ -300,7 +301,7 @@ async def get_vm_disk_info(request):
             
             if process.returncode != 0:
                 conn.close()
-                return web.json_response({'status': 'error', 'message': f'Failed to get disk info: {stderr.decode()}'}, status=500)
+                return json_response({'status': 'error', 'message': f'Failed to get disk info: {stderr.decode()}'}, status=500)
             
             disk_info = json.loads(stdout.decode())
             virtual_size_bytes = disk_info.get('virtual-size', 0)
@@ -310,7 +311,7 @@ async def get_vm_disk_info(request):
         # Validate that we got a valid disk size
         if virtual_size_bytes <= 0:
             conn.close()
-            return web.json_response({
+            return json_response({
                 'status': 'error', 
                 'message': f'Could not determine valid disk size (got {virtual_size_bytes} bytes)'
             }, status=500)
@@ -318,7 +319,7 @@ async def get_vm_disk_info(request):
         virtual_size_gb = virtual_size_bytes / (1024**3)
         
         conn.close()
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'current_size_gb': round(virtual_size_gb, 2),
             'disk_path': disk_path,
@@ -327,7 +328,7 @@ async def get_vm_disk_info(request):
         
     except Exception as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 
 async def update_vm_settings(request):
@@ -335,9 +336,9 @@ async def update_vm_settings(request):
     name = request.match_info.get('name')
     
     try:
-        data = await request.json()
+        data = await request.json(loads=json_loads)
     except json.JSONDecodeError:
-        return web.json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
+        return json_response({'status': 'error', 'message': 'Invalid JSON body.'}, status=400)
     
     memory_mb = data.get('memory_mb')
     vcpus = data.get('vcpus')
@@ -351,16 +352,16 @@ async def update_vm_settings(request):
     
     if not any([memory_mb, vcpus, disk_size_gb, new_name, description is not None, 
                 autostart is not None, vram_mb, audio_enabled is not None, resolution]):
-        return web.json_response({'status': 'error', 'message': 'No settings to update.'}, status=400)
+        return json_response({'status': 'error', 'message': 'No settings to update.'}, status=400)
     
     conn = get_connection()
     if not conn:
-        return web.json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
+        return json_response({'status': 'error', 'message': 'Could not connect to libvirt.'}, status=500)
     
     domain = get_domain_by_name(conn, name)
     if not domain:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'VM named {name} not found.'}, status=404)
+        return json_response({'status': 'error', 'message': f'VM named {name} not found.'}, status=404)
     
     # Check if VM is running for operations that require shutdown
     is_running = domain.isActive()
@@ -368,7 +369,7 @@ async def update_vm_settings(request):
     
     if is_running and requires_shutdown:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'VM {name} must be shut down before modifying these settings.'}, status=400)
+        return json_response({'status': 'error', 'message': f'VM {name} must be shut down before modifying these settings.'}, status=400)
     
     # Handle metadata updates (can be done while running)
     if description is not None or resolution:
@@ -402,7 +403,7 @@ async def update_vm_settings(request):
             changes.append(f'Resolution: {resolution}')
         if autostart is not None:
             changes.append(f'Autostart: {"enabled" if autostart else "disabled"}')
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'message': f'VM {name} settings updated successfully. Changes: {", ".join(changes)}'
         })
@@ -435,13 +436,13 @@ async def update_vm_settings(request):
                             # Check if it's a "shrink" error
                             if "shrink" in error_msg.lower():
                                 conn.close()
-                                return web.json_response({
+                                return json_response({
                                     'status': 'error', 
                                     'message': 'Cannot shrink disk. Disk can only be expanded.'
                                 }, status=400)
                             else:
                                 conn.close()
-                                return web.json_response({
+                                return json_response({
                                     'status': 'error', 
                                     'message': f'Failed to resize disk: {error_msg}'
                                 }, status=500)
@@ -535,7 +536,7 @@ async def update_vm_settings(request):
                         except Exception as e:
                             logger.error(f"Could not rename disk file: {e}")
                             conn.close()
-                            return web.json_response({'status': 'error', 'message': f'Failed to rename disk file: {e}'}, status=500)
+                            return json_response({'status': 'error', 'message': f'Failed to rename disk file: {e}'}, status=500)
             
             # Update VM name in XML
             name_element = root.find('name')
@@ -608,17 +609,17 @@ async def update_vm_settings(request):
             changes.append(f'Resolution hint: {resolution}')
         
         final_name = new_name if new_name and new_name != name else name
-        return web.json_response({
+        return json_response({
             'status': 'success', 
             'message': f'VM settings updated successfully. Changes: {", ".join(changes)}'
         })
         
     except libvirt.libvirtError as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': f'Libvirt operation failed: {e}'}, status=500)
+        return json_response({'status': 'error', 'message': f'Libvirt operation failed: {e}'}, status=500)
     except Exception as e:
         conn.close()
-        return web.json_response({'status': 'error', 'message': str(e)}, status=500)
+        return json_response({'status': 'error', 'message': str(e)}, status=500)
 
 
 async def get_host_specs(request):
@@ -631,7 +632,7 @@ async def get_host_specs(request):
     try:
         conn = get_connection('qemu')
         if not conn:
-            return web.json_response({
+            return json_response({
                 'status': 'error', 
                 'message': 'Could not connect to libvirt.'
             }, status=500)
@@ -647,7 +648,7 @@ async def get_host_specs(request):
         
         conn.close()
         
-        return web.json_response({
+        return json_response({
             'status': 'success',
             'total_memory_mb': total_memory_mb,
             'total_cpus': total_cpus
@@ -657,7 +658,7 @@ async def get_host_specs(request):
         logger.error(f"Libvirt error getting host specs: {e}")
         if conn:
             conn.close()
-        return web.json_response({
+        return json_response({
             'status': 'error', 
             'message': f'Libvirt operation failed: {e}'
         }, status=500)
@@ -665,7 +666,7 @@ async def get_host_specs(request):
         logger.error(f"Error getting host specs: {e}")
         if conn:
             conn.close()
-        return web.json_response({
+        return json_response({
             'status': 'error', 
             'message': str(e)
         }, status=500)
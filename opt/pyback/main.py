@@ -69,9 +69,14 @@ from pyback.proxies.host_console import host_console_handler
 
 # Import authentication middleware
 from pyback.auth.middleware import auth_middleware
+from pyback.auth.api_keys import start_last_used_flusher, stop_last_used_flusher
+
+# Import configuration preloading
+from pyback.config_loader import warm_all_configs
 
 # Import utilities for initialization
-from pyback.utils.libvirt_connection import get_connection
+from pyback.utils.libvirt_connection import get_connection, close_all_connections
+from pyback.utils.http_client import start_http_session, close_http_session
 
 # Initialize download progress tracking for VM deployment module
 import pyback.handlers.vm_deployment as vm_deployment_module
@@ -103,6 +108,20 @@ def init_app():
     app.middlewares.append(cors_middleware)
     app.middlewares.append(auth_middleware) 
 
+    # Load the configuration files before the first request needs them
+    app.on_startup.append(warm_all_configs)
+
+    # Persist API key usage timestamps in the background
+    app.on_startup.append(start_last_used_flusher)
+    app.on_cleanup.append(stop_last_used_flusher)
+
+    # Close the shared libvirt connections on shutdown
+    app.on_cleanup.append(close_all_connections)
+
+    # One outbound HTTP session shared by all handlers
+    app.on_startup.append(start_http_session)
+    app.on_cleanup.append(close_http_session)
+
     # ---< API Routes >---
     # Authentication
     app.router.add_post('/api/auth/login', login)
@@ -5,4 +5,7 @@ This package contains utility functions for:
 - Libvirt connection management
 - File operations (compression, extraction)
 - Network utilities (IP lookup, MAC handling)
+- JSON serialization (orjson with stdlib fallback)
+- JSON HTTP responses
+- Shared outbound HTTP client session
 """
@@ -0,0 +1,56 @@
+"""
+Shared outbound HTTP client.
+
+One aiohttp ClientSession is created when the application starts and
+stored on the app, so handlers reuse its connection pool and TLS sessions
+instead of opening a new session per request.
+"""
+
+import logging
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Key under which the shared session is stored on the application
+HTTP_SESSION_KEY = 'http_session'
+
+# Connection pool limits for the shared session
+HTTP_POOL_LIMIT = 32
+HTTP_POOL_LIMIT_PER_HOST = 8
+
+
+async def start_http_session(app):
+    """
+    Create the shared client session. Registered as an on_startup hook.
+
+    Args:
+        app: The aiohttp application
+    """
+    app[HTTP_SESSION_KEY] = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=HTTP_POOL_LIMIT, limit_per_host=HTTP_POOL_LIMIT_PER_HOST)
+    )
+
+
+async def close_http_session(app):
+    """
+    Close the shared client session. Registered as an on_cleanup hook.
+
+    Args:
+        app: The aiohttp application
+    """
+    session = app.get(HTTP_SESSION_KEY)
+    if session is not None:
+        await session.close()
+
+
+def get_http_session(app) -> aiohttp.ClientSession:
+    """
+    Get the shared client session.
+
+    Args:
+        app: The aiohttp application, e.g. request.app
+
+    Returns:
+        aiohttp.ClientSession: The session created by start_http_session()
+    """
+    return app[HTTP_SESSION_KEY]
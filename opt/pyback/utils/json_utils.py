@@ -0,0 +1,197 @@
+"""
+JSON serialization helpers.
+
+Decodes with msgspec or orjson and encodes with orjson or msgspec when
+they are installed, falling back to the standard library json module
+otherwise. Encoders and decoders are created once and reused. All paths
+read and produce the same documents.
+"""
+
+import dataclasses
+import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# Whether json_loads() accepts memoryview and other buffer objects
+LOADS_ACCEPTS_BUFFER = MSGSPEC_AVAILABLE or ORJSON_AVAILABLE
+
+
+if MSGSPEC_AVAILABLE:
+    # Decoder state is built once and reused for every document
+    _decoder = msgspec.json.Decoder()
+
+    def json_loads(data):
+        """
+        Parse a JSON document.
+
+        Args:
+            data: JSON document as bytes, str or a buffer object
+
+        Returns:
+            Parsed object
+
+        Raises:
+            json.JSONDecodeError: If the document is invalid, like the
+                other backends
+        """
+        try:
+            return _decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise json.JSONDecodeError(str(e), data if isinstance(data, str) else '', 0) from None
+elif ORJSON_AVAILABLE:
+    def json_loads(data):
+        """
+        Parse a JSON document.
+
+        Args:
+            data: JSON document as bytes, str or a buffer object
+
+        Returns:
+            Parsed object
+        """
+        return orjson.loads(data)
+else:
+    def json_loads(data):
+        """
+        Parse a JSON document.
+
+        Args:
+            data: JSON document as bytes or str
+
+        Returns:
+            Parsed object
+        """
+        return json.loads(data)
+
+
+if ORJSON_AVAILABLE:
+    def json_dumps(obj) -> bytes:
+        """
+        Serialize an object to indented JSON.
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+elif MSGSPEC_AVAILABLE:
+    _encoder = msgspec.json.Encoder()
+
+    def json_dumps(obj) -> bytes:
+        """
+        Serialize an object to indented JSON.
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        return msgspec.json.format(_encoder.encode(obj), indent=2)
+else:
+    # json.dumps() builds a new encoder whenever options are passed
+    _encoder = json.JSONEncoder(indent=2)
+
+    def json_dumps(obj) -> bytes:
+        """
+        Serialize an object to indented JSON.
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        return _encoder.encode(obj).encode('utf-8')
+
+
+if ORJSON_AVAILABLE:
+    def json_encode(obj) -> bytes:
+        """
+        Serialize an object to compact JSON, e.g. for HTTP responses.
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        # Non-string keys are converted like the json module does
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+elif MSGSPEC_AVAILABLE:
+    def json_encode(obj) -> bytes:
+        """
+        Serialize an object to compact JSON, e.g. for HTTP responses.
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        return _encoder.encode(obj)
+else:
+    _compact_encoder = json.JSONEncoder()
+
+    def json_encode(obj) -> bytes:
+        """
+        Serialize an object to compact JSON, e.g. for HTTP responses.
+
+        Args:
+            obj: Object to serialize
+
+        Returns:
+            UTF-8 encoded JSON document
+        """
+        return _compact_encoder.encode(obj).encode('utf-8')
+
+
+def json_loads_as(data, cls):
+    """
+    Parse a JSON object into an instance of a dataclass.
+
+    Fields missing from the document take their dataclass defaults.
+    Unknown keys are ignored. With msgspec the document is decoded
+    straight into the dataclass, without an intermediate dict.
+
+    Args:
+        data: JSON document as bytes or str
+        cls: Dataclass whose fields all have defaults; str fields must
+            receive strings and other fields may hold any JSON value
+
+    Returns:
+        An instance of cls
+
+    Raises:
+        ValueError: If the document is invalid or a field has the wrong type
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            return msgspec.json.decode(data, type=cls)
+        except msgspec.MsgspecError as e:
+            raise ValueError(str(e)) from None
+
+    obj = json_loads(data)
+    if not isinstance(obj, dict):
+        raise ValueError(f"Expected a JSON object, got {type(obj).__name__}")
+    values = {}
+    for field in dataclasses.fields(cls):
+        if field.name not in obj:
+            continue
+        value = obj[field.name]
+        if field.type in (str, 'str') and not isinstance(value, str):
+            raise ValueError(f"Expected a string for {field.name!r}")
+        values[field.name] = value
+    return cls(**values)
@@ -6,31 +6,102 @@ to libvirt and retrieving domain objects.
 """
 
 import logging
+import threading
 import libvirt
 from ..config import LIBVIRT_URI, LIBVIRT_LXC_URI
 
 logger = logging.getLogger(__name__)
 
+# Shared connections per URI, opened on first use and reused across requests
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+class SharedConnection:
+    """Proxy for a long-lived libvirt connection shared by all callers.
+    
+    Behaves like the underlying virConnect, except that close() is a no-op
+    so request handlers can keep closing their connection when done. The
+    real connection is closed by close_all_connections().
+    """
+    
+    __slots__ = ('conn',)
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+    
+    def close(self):
+        """Leaves the shared connection open."""
+        return 0
+
+
+def _is_alive(conn):
+    """Checks whether a libvirt connection is still usable."""
+    try:
+        return conn.isAlive() == 1
+    except libvirt.libvirtError:
+        return False
+
 
 def get_connection(conn_type='qemu'):
-    """Connects to libvirt or returns None/raises exception.
+    """Returns the shared libvirt connection, reconnecting if it has died.
     
     Args:
         conn_type: 'qemu' for VMs or 'lxc' for containers
         
     Returns:
-        libvirt connection object or None on failure
+        SharedConnection wrapping a libvirt connection, or None on failure
     """
-    try:
-        uri = LIBVIRT_LXC_URI if conn_type == 'lxc' else LIBVIRT_URI
-        conn = libvirt.open(uri)
-        if conn is None:
-            logger.error(f"Failed to open connection to {uri}")
+    uri = LIBVIRT_LXC_URI if conn_type == 'lxc' else LIBVIRT_URI
+    shared = _connections.get(uri)
+    if shared is not None and _is_alive(shared.conn):
+        return shared
+    
+    with _connections_lock:
+        # Another thread may have reconnected while we waited
+        shared = _connections.get(uri)
+        if shared is not None:
+            if _is_alive(shared.conn):
+                return shared
+            logger.warning(f"Libvirt connection to {uri} lost, reconnecting")
+            try:
+                shared.conn.close()
+            except libvirt.libvirtError:
+                pass
+            del _connections[uri]
+        
+        try:
+            conn = libvirt.open(uri)
+            if conn is None:
+                logger.error(f"Failed to open connection to {uri}")
+                return None
+        except libvirt.libvirtError as e:
+            logger.error(f"LIBVIRT ERROR: {e}")
             return None
-        return conn
-    except libvirt.libvirtError as e:
-        logger.error(f"LIBVIRT ERROR: {e}")
-        return None
+        
+        shared = SharedConnection(conn)
+        _connections[uri] = shared
+        return shared
+
+
+async def close_all_connections(app=None):
+    """Closes the shared libvirt connections.
+    
+    Can be registered directly as an aiohttp on_cleanup handler.
+    
+    Args:
+        app: The aiohttp application (unused)
+    """
+    with _connections_lock:
+        for shared in _connections.values():
+            try:
+                shared.conn.close()
+            except libvirt.libvirtError:
+                pass
+        _connections.clear()
 
 
 def get_domain_by_name(conn, name):
@@ -0,0 +1,66 @@
+"""
+HTTP response helpers.
+
+This module provides a drop-in replacement for aiohttp's json_response that
+serializes with the fastest available JSON backend, plus builders for the
+standard success and error envelopes.
+"""
+
+import functools
+
+from aiohttp import web
+
+from .json_utils import json_encode
+
+
+def json_response(data, status=200, headers=None):
+    """Builds a JSON response.
+    
+    Behaves like aiohttp.web.json_response, but encodes the body with orjson
+    (or msgspec) when installed instead of the stdlib json module.
+    
+    Args:
+        data: JSON-serializable object
+        status: HTTP status code
+        headers: optional extra response headers
+        
+    Returns:
+        web.Response with an application/json body
+    """
+    return web.Response(body=json_encode(data), status=status, headers=headers,
+                        content_type='application/json')
+
+
+@functools.lru_cache(maxsize=256)
+def _error_body(message):
+    """Encodes an error response body once per distinct message."""
+    return json_encode({'status': 'error', 'message': message})
+
+
+def error_response(message, status=500):
+    """Builds a {'status': 'error', 'message': ...} response.
+    
+    The body is encoded once per message and reused, so only pass constant
+    messages; messages with user input would fill the cache.
+    
+    Args:
+        message: the error message
+        status: HTTP status code
+        
+    Returns:
+        web.Response with an application/json body
+    """
+    return web.Response(body=_error_body(message), status=status,
+                        content_type='application/json')
+
+
+def success_response(**fields):
+    """Builds a {'status': 'success', ...} response.
+    
+    Args:
+        **fields: additional top-level fields for the body
+        
+    Returns:
+        web.Response with an application/json body
+    """
+    return json_response({'status': 'success', **fields})